@@ -18,7 +18,12 @@ import logging
 import random
 
 import numpy as np
-from utils import get_tokenizer, sample_requests
+from utils import (
+    file_fingerprint,
+    get_tokenizer,
+    load_cached_requests,
+    sample_requests,
+)
 from benchmark_runner import BenchmarkRunner
 
 
@@ -28,15 +33,9 @@ logger = logging.getLogger(__name__)
 
 class LatencyBenchmarkRunner(BenchmarkRunner):
     async def _run(self):
-        total_requests = len(self.input_requests)
-        for i, request in enumerate(self.input_requests):
+        for request in self.input_requests:
             await self.send_request(request)
-            remaining = total_requests - (i + 1)
-            print(
-                f"\rProcessed {i + 1}/{total_requests} requests, {remaining} remaining.",
-                end="",
-            )
-        print("")
+            self.report_progress()
 
 
 def main(args: argparse.Namespace):
@@ -48,8 +47,31 @@ def main(args: argparse.Namespace):
     model_uid = args.model_uid
 
     logger.info("Preparing for benchmark.")
-    tokenizer = get_tokenizer(args.tokenizer, trust_remote_code=args.trust_remote_code)
-    input_requests = sample_requests(args.dataset, args.num_prompts, tokenizer)
+
+    def create_requests():
+        tokenizer = get_tokenizer(
+            args.tokenizer, trust_remote_code=args.trust_remote_code
+        )
+        return sample_requests(
+            args.dataset,
+            args.num_prompts,
+            tokenizer,
+            prompt_len_limit=args.prompt_len_limit,
+        )
+
+    input_requests = load_cached_requests(
+        (
+            "sample_requests",
+            file_fingerprint(args.dataset),
+            args.tokenizer,
+            args.trust_remote_code,
+            args.num_prompts,
+            args.prompt_len_limit,
+            args.seed,
+        ),
+        create_requests,
+        use_cache=not args.no_cache,
+    )
 
     logger.info("Benchmark starts.")
 
@@ -81,6 +103,9 @@ if __name__ == "__main__":
     parser.add_argument(
         "--num-prompts", type=int, default=100, help="Number of prompts to process."
     )
+    parser.add_argument(
+        "--prompt-len-limit", type=int, default=1024, help="Prompt length limitation."
+    )
     parser.add_argument("--seed", type=int, default=0)
     parser.add_argument(
         "--trust-remote-code",
@@ -102,5 +127,10 @@ if __name__ == "__main__":
         action="store_true",
         help="Print detailed error messages if any errors encountered."
     )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not load or save the tokenized requests cached on disk.",
+    )
     args = parser.parse_args()
     main(args)
@@ -19,7 +19,11 @@ import random
 
 import numpy as np
 
-from utils import generate_sorting_prompts, get_tokenizer
+from utils import (
+    generate_sorting_prompts,
+    get_tokenizer,
+    load_cached_requests,
+)
 from benchmark_runner import ConcurrentBenchmarkRunner
 
 
@@ -28,26 +32,26 @@ logger = logging.getLogger(__name__)
 
 
 class LongBenchmarkRunner(ConcurrentBenchmarkRunner):
+    def __init__(self, *args, num_prompts: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        # The prompts are repeated until num_prompts requests are sent.
+        self.num_requests = num_prompts
+        self._unclaimed = num_prompts
+
     async def _run(self):
         tasks = []
         for i in range(self.concurrency):
             tasks.append(asyncio.create_task(self.worker(i)))
 
-        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        await asyncio.gather(*tasks)
 
     async def worker(self, i: int):
-        r = random.Random(i)
-        index = r.randint(0, len(self.input_requests) - 1)
-        while self.left > 0:
-            request = self.input_requests[index]
-            index += 1
-            index = index % len(self.input_requests)
-            await self.send_request(request)
-            self.left -= 1
-            # pring longer space to overwrite the previous when left decrease
-            print("\rdone_request, left %d    " % (self.left), end="")
-        # The last one
-        print("")
+        # Each worker keeps sending its own prompt, so that the server can
+        # reuse the KV cache of the prompt prefix across the requests.
+        request = self.input_requests[i % len(self.input_requests)]
+        while self.claim_request():
+            await self.dispatch_request(request)
+            self.report_progress()
 
 
 def main(args: argparse.Namespace):
@@ -63,11 +67,28 @@ def main(args: argparse.Namespace):
     model_uid = args.model_uid
 
     logger.info("Preparing for benchmark.")
-    tokenizer = get_tokenizer(args.tokenizer, trust_remote_code=args.trust_remote_code)
-    # XXX: generate_sorting_prompts() currently only generate prompts 1/2 to 2/3 of context_length,
-    # because tokenizers vary by models, consider improve in the future.
-    input_requests = generate_sorting_prompts(
-        args.concurrency, args.context_length, args.context_length / 2 - 20, tokenizer
+
+    def create_requests():
+        tokenizer = get_tokenizer(
+            args.tokenizer, trust_remote_code=args.trust_remote_code
+        )
+        # XXX: generate_sorting_prompts() currently only generate prompts 1/2 to 2/3 of context_length,
+        # because tokenizers vary by models, consider improve in the future.
+        return generate_sorting_prompts(
+            args.concurrency, args.context_length, args.context_length / 2 - 20, tokenizer
+        )
+
+    input_requests = load_cached_requests(
+        (
+            "generate_sorting_prompts",
+            args.tokenizer,
+            args.trust_remote_code,
+            args.concurrency,
+            args.context_length,
+            args.seed,
+        ),
+        create_requests,
+        use_cache=not args.no_cache,
     )
 
     logger.info("Benchmark starts.")
@@ -78,8 +99,17 @@ def main(args: argparse.Namespace):
         input_requests,
         args.stream,
         concurrency=args.concurrency,
+        num_prompts=args.num_prompts,
         api_key=args.api_key,
         print_error=args.print_error,
+        latency_threshold=(
+            args.latency_threshold_ms / 1000
+            if args.adaptive_concurrency
+            else None
+        ),
+        hedge_delay=(
+            args.hedge_delay_ms / 1000 if args.hedge_delay_ms is not None else None
+        ),
     )
     asyncio.run(benchmark.run())
 
@@ -126,5 +156,29 @@ if __name__ == "__main__":
         action="store_true",
         help="Print detailed error messages if any errors encountered."
     )
+    parser.add_argument(
+        "--adaptive-concurrency",
+        action="store_true",
+        help="Adapt the number of in-flight requests (up to --concurrency) "
+        "to the server's latency instead of keeping it fixed.",
+    )
+    parser.add_argument(
+        "--latency-threshold-ms",
+        type=float,
+        default=10000,
+        help="Request latency above which adaptive concurrency backs off.",
+    )
+    parser.add_argument(
+        "--hedge-delay-ms",
+        type=float,
+        default=None,
+        help="Send a backup request if a request has not completed after "
+        "this delay, and keep whichever completes first.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not load or save the tokenized requests cached on disk.",
+    )
     args = parser.parse_args()
     main(args)
@@ -17,7 +17,6 @@ import asyncio
 import logging
 import random
 import time
-import aiohttp
 from typing import List, Dict, Optional
 from datasets import load_dataset
 import numpy as np
@@ -56,21 +55,17 @@ class RerankBenchmarkRunner(ConcurrentBenchmarkRunner):
         for i in range(self.concurrency):
             tasks.append(asyncio.create_task(self.worker(i)))
 
-        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+        await asyncio.gather(*tasks)
 
     async def worker(self, i: int):
         r = random.Random(i)
         index = r.randint(0, len(self.input_requests) - 1)
-        while self.left > 0:
+        while self.claim_request():
             request = self.input_requests[index]
             index += 1
             index = index % len(self.input_requests)
             await self.send_request(request)
-            self.left -= 1
-            # pring longer space to overwrite the previous when left decrease
-            print("\rdone_request, left %d    " % (self.left), end="")
-        # The last one
-        print("")
+            self.report_progress()
 
     async def send_request(self, request, warming_up: bool = False):
         prompt, documents = request["query"], request["positive"]
@@ -87,19 +82,17 @@ class RerankBenchmarkRunner(ConcurrentBenchmarkRunner):
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
 
-        timeout = aiohttp.ClientTimeout(total=3 * 3600)
-        async with aiohttp.ClientSession(timeout=timeout) as session:
-            async with session.post(
-                self.api_url, headers=headers, json=pload
-            ) as response:
-                resp = await response.json()
-                if response.status == 200:
-                    request_end_time = time.time()
-                    request_latency = request_end_time - request_start_time
-                    if not warming_up:
-                        self.outputs.append(request_latency)
-                else:
-                    logger.error(f"Failed to create chat completion: {resp}")
+        async with self.session.post(
+            self.api_url, headers=headers, json=pload
+        ) as response:
+            resp = await response.json()
+            if response.status == 200:
+                request_end_time = time.time()
+                request_latency = request_end_time - request_start_time
+                if not warming_up:
+                    self.outputs.append(request_latency)
+            else:
+                logger.error(f"Failed to create chat completion: {resp}")
 
 
 def main(args: argparse.Namespace):
@@ -13,6 +13,8 @@
 # limitations under the License.
 
 import aiohttp
+import asyncio
+import itertools
 import json
 import sys
 import traceback
@@ -23,12 +25,26 @@ import time
 from typing import List, Optional, Tuple
 
 import numpy as np
+from tqdm import tqdm
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 AIOHTTP_TIMEOUT = aiohttp.ClientTimeout(total=3 * 3600)
 
+RESULT_DTYPE = np.dtype(
+    [
+        ("success", np.bool_),
+        ("prompt_len", np.int64),
+        ("completion_tokens", np.int64),
+        ("latency", np.float64),
+        ("ttft", np.float64),
+        ("completion_time", np.float64),
+    ]
+)
+# The share of the earliest completed requests excluded from the steady throughput.
+WARMUP_FRACTION = 0.25
+
 
 def remove_prefix(text: str, prefix: str) -> str:
     if text.startswith(prefix):
@@ -44,9 +60,70 @@ class RequestOutput:
     latency: float = 0.0
     ttft: float = 0.0
     itl: List[float] = field(default_factory=list)  # List of inter-token latencies
+    completion_time: float = 0.0  # time.perf_counter() when the request completed
     error: str = ""
 
 
+class AdaptiveLimiter:
+    """
+    AIMD limit of in-flight requests. The limit grows additively while
+    requests succeed within ``latency_threshold`` seconds, and shrinks
+    multiplicatively on errors or slow requests, so the benchmark settles
+    around the knee of the server's throughput/latency curve."""
+
+    def __init__(
+        self,
+        max_limit: int,
+        latency_threshold: float,
+        min_limit: int = 1,
+        increase: float = 1.0,
+        decrease_ratio: float = 0.5,
+    ):
+        self.max_limit = max_limit
+        self.min_limit = min(min_limit, max_limit)
+        self.latency_threshold = latency_threshold
+        self.increase = increase
+        self.decrease_ratio = decrease_ratio
+        self.current: float = self.min_limit
+        self.in_flight = 0
+        self._cond: Optional[asyncio.Condition] = None
+
+    @property
+    def limit(self) -> int:
+        return int(self.current)
+
+    def _get_cond(self) -> asyncio.Condition:
+        # delay the creation until the event loop is running
+        if self._cond is None:
+            self._cond = asyncio.Condition()
+        return self._cond
+
+    async def acquire(self):
+        cond = self._get_cond()
+        async with cond:
+            await cond.wait_for(lambda: self.in_flight < self.limit)
+            self.in_flight += 1
+
+    async def release(self, output: Optional[RequestOutput]):
+        cond = self._get_cond()
+        async with cond:
+            self.in_flight -= 1
+            if (
+                output is None
+                or not output.success
+                or output.latency > self.latency_threshold
+            ):
+                self.current = max(
+                    self.min_limit, self.current * self.decrease_ratio
+                )
+            else:
+                # Grow by `increase` once per window of `limit` successful requests.
+                self.current = min(
+                    self.max_limit, self.current + self.increase / self.current
+                )
+            cond.notify_all()
+
+
 class BenchmarkRunner:
     def __init__(
         self,
@@ -60,18 +137,45 @@ class BenchmarkRunner:
         self.api_url = api_url
         self.model_uid = model_uid
         self.input_requests = input_requests
+        self.num_requests = len(input_requests)
         self.outputs: List[RequestOutput] = []
         self.benchmark_time = None
         self.stream = stream
         self.api_key = api_key
         self.print_error = print_error
+        self.session: Optional[aiohttp.ClientSession] = None
+        self.pbar: Optional[tqdm] = None
+
+    @property
+    def connection_limit(self) -> int:
+        return 1
 
     async def run(self):
-        await self.warm_up()
-        start_time = time.time()
-        await self._run()
-        end_time = time.time()
-        self.benchmark_time = end_time - start_time
+        # Share one session so that connections are kept alive and reused
+        # across requests instead of doing a handshake per request.
+        self.session = aiohttp.ClientSession(
+            timeout=AIOHTTP_TIMEOUT,
+            connector=aiohttp.TCPConnector(
+                limit=self.connection_limit, keepalive_timeout=60
+            ),
+        )
+        try:
+            await self.warm_up()
+            # tqdm throttles the refreshes, so reporting every request is cheap.
+            self.pbar = tqdm(total=self.num_requests, unit="req")
+            start_time = time.time()
+            await self._run()
+            end_time = time.time()
+            self.benchmark_time = end_time - start_time
+        finally:
+            if self.pbar is not None:
+                self.pbar.close()
+            await self.aclose()
+
+    async def aclose(self):
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
 
     async def warm_up(self, num_requests: int = 5):
         logger.info("Warming up...")
@@ -83,7 +187,16 @@ class BenchmarkRunner:
     async def _run(self):
         pass
 
+    def report_progress(self):
+        self.pbar.update(1)
+
     async def send_request(self, request: tuple, warming_up: bool = False):
+        output = await self.post_request(request)
+        if not warming_up:
+            self.outputs.append(output)
+        return output
+
+    async def post_request(self, request: tuple) -> RequestOutput:
         prompt, prompt_len, output_len = request
 
         if self.stream:
@@ -112,125 +225,159 @@ class BenchmarkRunner:
         if self.api_key:
             headers["Authorization"] = f"Bearer {self.api_key}"
 
-        async with aiohttp.ClientSession(timeout=AIOHTTP_TIMEOUT) as session:
-            output = RequestOutput(prompt_len=prompt_len)
-            ttft = 0.0
-            st = time.perf_counter()
-            most_recent_timestamp = st
-
-            try:
-                async with session.post(
-                    self.api_url, headers=headers, json=pload
-                ) as response:
-                    if response.status == 200:
-                        if self.stream:
-                            async for chunk_bytes in response.content:
-                                # {
-                                #     "id": "chataec79465-dfea-46af-81b9-c28124063fc0",
-                                #     "model": "llama-3-instruct",
-                                #     "created": 1721202668,
-                                #     "object": "chat.completion.chunk",
-                                #     "choices": [
-                                #         {
-                                #             "index": 0,
-                                #             "delta": {"role": "assistant", "content": ""},
-                                #             "finish_reason": null,
-                                #         }
-                                #     ],
-                                # }
-                                chunk_bytes = chunk_bytes.strip()
-                                if not chunk_bytes:
-                                    continue
-
-                                chunk = remove_prefix(chunk_bytes.decode("utf-8"), "data:")
-
-                                if chunk == "[DONE]":
-                                    latency = time.perf_counter() - st
+        output = RequestOutput(prompt_len=prompt_len)
+        ttft = 0.0
+        st = time.perf_counter()
+        most_recent_timestamp = st
+
+        try:
+            async with self.session.post(
+                self.api_url, headers=headers, json=pload
+            ) as response:
+                if response.status == 200:
+                    if self.stream:
+                        async for chunk_bytes in response.content:
+                            # {
+                            #     "id": "chataec79465-dfea-46af-81b9-c28124063fc0",
+                            #     "model": "llama-3-instruct",
+                            #     "created": 1721202668,
+                            #     "object": "chat.completion.chunk",
+                            #     "choices": [
+                            #         {
+                            #             "index": 0,
+                            #             "delta": {"role": "assistant", "content": ""},
+                            #             "finish_reason": null,
+                            #         }
+                            #     ],
+                            # }
+                            chunk_bytes = chunk_bytes.strip()
+                            if not chunk_bytes:
+                                continue
+
+                            chunk = remove_prefix(chunk_bytes.decode("utf-8"), "data:")
+
+                            if chunk == "[DONE]":
+                                latency = time.perf_counter() - st
+                            else:
+                                timestamp = time.perf_counter()
+                                data = json.loads(chunk)
+
+                                # First token
+                                if ttft == 0.0:
+                                    ttft = time.perf_counter() - st
+                                    output.ttft = ttft
+
+                                # Decoding phase
                                 else:
-                                    timestamp = time.perf_counter()
-                                    data = json.loads(chunk)
-
-                                    # First token
-                                    if ttft == 0.0:
-                                        ttft = time.perf_counter() - st
-                                        output.ttft = ttft
-
-                                    # Decoding phase
-                                    else:
-                                        output.itl.append(timestamp - most_recent_timestamp)
-
-                                    most_recent_timestamp = timestamp
-
-                            output.latency = latency
-                            output.success = True
-                            output.completion_tokens = data["usage"]["completion_tokens"]
-                        else:
-                            resp = await response.json()
-                            output.latency = time.perf_counter() - st
-                            output.success = True
-                            output.completion_tokens = resp["usage"]["completion_tokens"]
-            except Exception:
-                output.success = False
-                exc_info = sys.exc_info()
-                output.error = "".join(traceback.format_exception(*exc_info))
-
-            if not warming_up:
-                self.outputs.append(output)
+                                    output.itl.append(timestamp - most_recent_timestamp)
+
+                                most_recent_timestamp = timestamp
+
+                        output.latency = latency
+                        output.success = True
+                        output.completion_tokens = data["usage"]["completion_tokens"]
+                    else:
+                        resp = await response.json()
+                        output.latency = time.perf_counter() - st
+                        output.success = True
+                        output.completion_tokens = resp["usage"]["completion_tokens"]
+        except Exception:
+            output.success = False
+            exc_info = sys.exc_info()
+            output.error = "".join(traceback.format_exception(*exc_info))
+
+        output.completion_time = time.perf_counter()
+        return output
+
+    def _collect_results(self) -> np.ndarray:
+        """Gather the per-request results into one structured array, so that
+        statistics are computed by vectorized operations."""
+        return np.array(
+            [
+                (
+                    output.success,
+                    output.prompt_len,
+                    output.completion_tokens,
+                    output.latency,
+                    output.ttft,
+                    output.completion_time,
+                )
+                for output in self.outputs
+            ],
+            dtype=RESULT_DTYPE,
+        )
+
+    @staticmethod
+    def _steady_throughput(succeeded: np.ndarray) -> float:
+        """
+        Output token throughput between the completions of the first
+        WARMUP_FRACTION of the requests and of the last one, which excludes
+        the ramp-up while the server is not yet fully loaded."""
+        if succeeded.size < 2:
+            return 0.0
+        ordered = np.sort(succeeded, order="completion_time")
+        completion_times = ordered["completion_time"]
+        start = int(succeeded.size * WARMUP_FRACTION)
+        if start == succeeded.size - 1:
+            start -= 1
+        duration = completion_times[-1] - completion_times[start]
+        if duration <= 0:
+            return 0.0
+        return ordered["completion_tokens"][start + 1 :].sum() / duration
 
     def print_stats(self):
         total_time = self.benchmark_time
 
+        results = self._collect_results()
+        success = results["success"]
+        completed = int(np.count_nonzero(success))
+        if completed == 0:
+            warnings.warn(
+                "All requests failed. This is likely due to a misconfiguration "
+                "on the benchmark arguments.",
+                stacklevel=2,
+            )
+
+        succeeded = results[success]
+        prompt_lens = succeeded["prompt_len"]
+        output_lens = succeeded["completion_tokens"]
+        latencies = succeeded["latency"]
+        total_input = int(prompt_lens.sum())
+        total_output = int(output_lens.sum())
+        steady_output_throughput = self._steady_throughput(succeeded)
+
         if self.stream:
-            # Initialize variables for metrics
-            total_input = 0
-            completed = 0
-            actual_output_lens = []
-            itls = []
-            tpots = []
-            ttfts = []
-
-            for output in self.outputs:
-                if output.success:
-                    actual_output_lens.append(output.completion_tokens)
-                    total_input += output.prompt_len
-                    if output.completion_tokens > 1:
-                        tpots.append(
-                            (output.latency - output.ttft)
-                            / (output.completion_tokens - 1)
-                        )
-                    itls += output.itl
-                    ttfts.append(output.ttft)
-                    completed += 1
-                else:
-                    actual_output_lens.append(0)
-
-            if completed == 0:
-                warnings.warn(
-                    "All requests failed. This is likely due to a misconfiguration "
-                    "on the benchmark arguments.",
-                    stacklevel=2,
-                )
+            multi_token = output_lens > 1
+            tpots = (latencies[multi_token] - succeeded["ttft"][multi_token]) / (
+                output_lens[multi_token] - 1
+            )
+            itls = np.fromiter(
+                itertools.chain.from_iterable(
+                    output.itl for output in self.outputs if output.success
+                ),
+                dtype=np.float64,
+            )
+            ttfts = succeeded["ttft"]
 
             # Calculate statistics
-            total_output = sum(actual_output_lens)
             request_throughput = completed / total_time if total_time > 0 else 0
             input_throughput = total_input / total_time if total_time > 0 else 0
             output_throughput = total_output / total_time if total_time > 0 else 0
 
-            mean_ttft = np.mean(ttfts) * 1000 if ttfts else 0
-            median_ttft = np.median(ttfts) * 1000 if ttfts else 0
-            std_ttft = np.std(ttfts) * 1000 if ttfts else 0
-            p99_ttft = np.percentile(ttfts, 99) * 1000 if ttfts else 0
+            mean_ttft = np.mean(ttfts) * 1000 if ttfts.size else 0
+            median_ttft = np.median(ttfts) * 1000 if ttfts.size else 0
+            std_ttft = np.std(ttfts) * 1000 if ttfts.size else 0
+            p99_ttft = np.percentile(ttfts, 99) * 1000 if ttfts.size else 0
 
-            mean_tpot = np.mean(tpots) * 1000 if tpots else 0
-            median_tpot = np.median(tpots) * 1000 if tpots else 0
-            std_tpot = np.std(tpots) * 1000 if tpots else 0
-            p99_tpot = np.percentile(tpots, 99) * 1000 if tpots else 0
+            mean_tpot = np.mean(tpots) * 1000 if tpots.size else 0
+            median_tpot = np.median(tpots) * 1000 if tpots.size else 0
+            std_tpot = np.std(tpots) * 1000 if tpots.size else 0
+            p99_tpot = np.percentile(tpots, 99) * 1000 if tpots.size else 0
 
-            mean_itl = np.mean(itls) * 1000 if itls else 0
-            median_itl = np.median(itls) * 1000 if itls else 0
-            std_itl = np.std(itls) * 1000 if itls else 0
-            p99_itl = np.percentile(itls, 99) * 1000 if itls else 0
+            mean_itl = np.mean(itls) * 1000 if itls.size else 0
+            median_itl = np.median(itls) * 1000 if itls.size else 0
+            std_itl = np.std(itls) * 1000 if itls.size else 0
+            p99_itl = np.percentile(itls, 99) * 1000 if itls.size else 0
 
             # Print benchmark results
             print("{s:{c}^{n}}".format(s=" Benchmark Result ", n=50, c="="))
@@ -253,6 +400,11 @@ class BenchmarkRunner:
                     "Output token throughput (tok/s):", output_throughput
                 )
             )
+            print(
+                "{:<40} {:<10.2f}".format(
+                    "Steady output throughput (tok/s):", steady_output_throughput
+                )
+            )
 
             print("{s:{c}^{n}}".format(s="Time to First Token", n=50, c="-"))
             print("{:<40} {:<10.4f}".format("Mean TTFT (ms):", mean_ttft))
@@ -278,49 +430,23 @@ class BenchmarkRunner:
 
             print("=" * 50)
         else:
-            # Initialize variables for metrics
-            total_input = 0
-            completed = 0
-            actual_output_lens = []
-            latencies = []
-            per_token_latencies = []
-            per_output_token_latencies = []
-
-            for output in self.outputs:
-                if output.success:
-                    actual_output_lens.append(output.completion_tokens)
-                    total_input += output.prompt_len
-                    latencies.append(output.latency)
-                    per_token_latencies.append(
-                        output.latency / (output.prompt_len + output.completion_tokens)
-                    )
-                    if output.completion_tokens > 0:
-                        per_output_token_latencies.append(
-                            output.latency / output.completion_tokens
-                        )
-                    completed += 1
-                else:
-                    actual_output_lens.append(0)
-
-            if completed == 0:
-                warnings.warn(
-                    "All requests failed. This is likely due to a misconfiguration "
-                    "on the benchmark arguments.",
-                    stacklevel=2,
-                )
+            per_token_latencies = latencies / (prompt_lens + output_lens)
+            has_output = output_lens > 0
+            per_output_token_latencies = latencies[has_output] / output_lens[has_output]
 
             # Calculate statistics
-            total_output = sum(actual_output_lens)
             request_throughput = len(self.outputs) / total_time if total_time > 0 else 0
             input_throughput = total_input / total_time if total_time > 0 else 0
             output_throughput = total_output / total_time if total_time > 0 else 0
 
-            mean_latency = np.mean(latencies) if latencies else 0
+            mean_latency = latencies.mean() if latencies.size else 0
             mean_per_token_latency = (
-                np.mean(per_token_latencies) if per_token_latencies else 0
+                per_token_latencies.mean() if per_token_latencies.size else 0
             )
             mean_per_output_token_latency = (
-                np.mean(per_output_token_latencies) if per_output_token_latencies else 0
+                per_output_token_latencies.mean()
+                if per_output_token_latencies.size
+                else 0
             )
 
             # Print benchmark results
@@ -344,6 +470,11 @@ class BenchmarkRunner:
                     "Output token throughput (tok/s):", output_throughput
                 )
             )
+            print(
+                "{:<40} {:<10.2f}".format(
+                    "Steady output throughput (tok/s):", steady_output_throughput
+                )
+            )
 
             print("{s:{c}^{n}}".format(s="Latency Statistics", n=50, c="-"))
             print("{:<40} {:<10.4f}".format("Mean latency (s):", mean_latency))
@@ -363,7 +494,7 @@ class BenchmarkRunner:
             print(f"Total time: {total_time:.2f} s")
             print(f"Throughput: {len(self.outputs) / total_time:.2f} requests/s")
 
-        if completed < len(self.input_requests):
+        if completed < self.num_requests:
             if self.print_error:
                 logger.info("Errors encountered during benchmark:")
                 for output in self.outputs:
@@ -385,6 +516,8 @@ class ConcurrentBenchmarkRunner(BenchmarkRunner):
         concurrency: int,
         api_key: Optional[str] = None,
         print_error: bool = False,
+        latency_threshold: Optional[float] = None,
+        hedge_delay: Optional[float] = None,
     ):
         super().__init__(
             api_url,
@@ -395,7 +528,83 @@ class ConcurrentBenchmarkRunner(BenchmarkRunner):
             print_error,
         )
         self.concurrency = concurrency
-        self.left = len(input_requests)
+        self.hedge_delay = hedge_delay
+        self._unclaimed = self.num_requests
+        # With a latency threshold, `concurrency` workers are started but the
+        # number of in-flight requests is adapted by the limiter.
+        self.limiter = (
+            AdaptiveLimiter(concurrency, latency_threshold)
+            if latency_threshold is not None
+            else None
+        )
+
+    @property
+    def connection_limit(self) -> int:
+        # a hedged request may hold two connections
+        return self.concurrency * (2 if self.hedge_delay is not None else 1)
 
     async def worker(self):
         pass
+
+    def claim_request(self) -> bool:
+        """
+        Reserve one of the requests not yet dispatched for the calling worker,
+        return False when there are none left and the worker should exit."""
+        if self._unclaimed <= 0:
+            return False
+        self._unclaimed -= 1
+        return True
+
+    async def send_hedged_request(self, request: tuple) -> RequestOutput:
+        """
+        Send the request, and if it has not completed after `hedge_delay`
+        seconds, send a backup copy and keep whichever completes first.
+        The latency of a winning backup includes the hedge delay."""
+        start = time.perf_counter()
+        first = asyncio.create_task(self.post_request(request))
+        done, _ = await asyncio.wait({first}, timeout=self.hedge_delay)
+        if done:
+            return first.result()
+
+        backup_offset = time.perf_counter() - start
+        backup = asyncio.create_task(self.post_request(request))
+        pending = {first, backup}
+        try:
+            while True:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                winner = first if first in done else backup
+                output = winner.result()
+                # Prefer a successful attempt if the other one is still running.
+                if output.success or not pending:
+                    break
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if winner is backup:
+            output.latency += backup_offset
+            if output.ttft:
+                output.ttft += backup_offset
+        return output
+
+    async def dispatch_request(self, request: tuple):
+        if self.limiter is not None:
+            await self.limiter.acquire()
+        output = None
+        try:
+            if self.hedge_delay is not None:
+                output = await self.send_hedged_request(request)
+            else:
+                output = await self.post_request(request)
+            self.outputs.append(output)
+        finally:
+            if self.limiter is not None:
+                await self.limiter.release(output)
+        return output
+
+    def print_stats(self):
+        super().print_stats()
+        if self.limiter is not None:
+            print(f"Adaptive concurrency limit: {self.limiter.limit}")
@@ -20,7 +20,12 @@ from typing import List, Tuple, Optional
 
 import numpy as np
 
-from utils import sample_requests, get_tokenizer
+from utils import (
+    file_fingerprint,
+    get_tokenizer,
+    load_cached_requests,
+    sample_requests,
+)
 from benchmark_runner import ConcurrentBenchmarkRunner
 
 
@@ -28,6 +33,49 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+class TokenBucket:
+    """
+    Release request tokens at ``rate`` per second to all workers. A single
+    refill task waits intervals sampled from the exponential distribution,
+    so the aggregate request arrivals follow a Poisson process no matter
+    how many workers are waiting on the bucket."""
+
+    def __init__(
+        self, rate: float, num_tokens: int, capacity: int = 1, seed: int = 0
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        # Sample all the intervals at once instead of one RNG call per token.
+        self.intervals = np.random.default_rng(seed).exponential(
+            1.0 / rate, size=num_tokens
+        )
+        self._tokens: Optional[asyncio.Queue] = None
+        self._refill_task: Optional[asyncio.Task] = None
+
+    def start(self):
+        # delay the creation of the queue until the event loop is running
+        self._tokens = asyncio.Queue(self.capacity)
+        self._refill_task = asyncio.create_task(self._refill())
+
+    async def stop(self):
+        if self._refill_task is not None:
+            self._refill_task.cancel()
+            try:
+                await self._refill_task
+            except asyncio.CancelledError:
+                pass
+            self._refill_task = None
+
+    async def _refill(self):
+        for interval in self.intervals:
+            # Block while the bucket is full, so idle time does not build up a burst.
+            await self._tokens.put(None)
+            await asyncio.sleep(interval)
+
+    async def acquire(self):
+        await self._tokens.get()
+
+
 class ServingBenchmarkRunner(ConcurrentBenchmarkRunner):
     def __init__(
         self,
@@ -39,6 +87,9 @@ class ServingBenchmarkRunner(ConcurrentBenchmarkRunner):
         request_rate: float,
         api_key: Optional[str] = None,
         print_error: bool = False,
+        latency_threshold: Optional[float] = None,
+        hedge_delay: Optional[float] = None,
+        seed: int = 0,
     ):
         super().__init__(
             api_url,
@@ -48,45 +99,44 @@ class ServingBenchmarkRunner(ConcurrentBenchmarkRunner):
             concurrency,
             api_key,
             print_error,
+            latency_threshold,
+            hedge_delay,
         )
         self.request_rate = request_rate
-        self.queue = None  # delay the creation of the queue
+        # Workers pull from one shared iterator, ``next()`` never yields to
+        # the event loop so no queue or lock is needed.
+        self._requests = iter(self.input_requests)
+        # If the request rate is infinity, then we don't need to wait.
+        self.bucket = (
+            TokenBucket(request_rate, len(input_requests), seed=seed)
+            if request_rate != float("inf")
+            else None
+        )
 
     async def _run(self):
+        if self.bucket is not None:
+            self.bucket.start()
+
         tasks = []
 
         for _ in range(self.concurrency):
             tasks.append(asyncio.create_task(self.worker()))
 
-        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
-
-    async def warm_up(self, num_requests: int = 5):
-        if self.queue is None:
-            self.queue = asyncio.Queue(len(self.input_requests))
-
-        logger.info(f"Enqueuing {len(self.input_requests)} requests.")
-        for req in iter(self.input_requests):
-            await self.queue.put(req)
-        await super().warm_up(num_requests)
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            if self.bucket is not None:
+                await self.bucket.stop()
 
     async def worker(self):
         """
-        wait request dispatch by run(), and then send_request.
-        When all request is done, most worker will hang on self.queue,
-        but at least one worker will exit"""
-        while self.left > 0:
-            request = await self.queue.get()
-            await self.send_request(request)
-            self.left -= 1
-            print("\rdone_request, left %d    " % (self.left), end="")
-
-            if self.request_rate != float("inf"):
-                # If the request rate is infinity, then we don't need to wait.
-                # Sample the request interval from the exponential distribution.
-                interval = np.random.exponential(1.0 / self.request_rate)
-                # The next request will be sent after the interval.
-                await asyncio.sleep(interval)
-        print("")
+        pull requests from the shared iterator and send_request,
+        the worker exits once all requests have been dispatched."""
+        for request in self._requests:
+            if self.bucket is not None:
+                await self.bucket.acquire()
+            await self.dispatch_request(request)
+            self.report_progress()
 
 
 def main(args: argparse.Namespace):
@@ -102,12 +152,30 @@ def main(args: argparse.Namespace):
     model_uid = args.model_uid
 
     logger.info("Preparing for benchmark.")
-    tokenizer = get_tokenizer(args.tokenizer, trust_remote_code=args.trust_remote_code)
-    input_requests = sample_requests(
-        args.dataset,
-        args.num_prompts,
-        tokenizer,
-        prompt_len_limit=args.prompt_len_limit,
+
+    def create_requests():
+        tokenizer = get_tokenizer(
+            args.tokenizer, trust_remote_code=args.trust_remote_code
+        )
+        return sample_requests(
+            args.dataset,
+            args.num_prompts,
+            tokenizer,
+            prompt_len_limit=args.prompt_len_limit,
+        )
+
+    input_requests = load_cached_requests(
+        (
+            "sample_requests",
+            file_fingerprint(args.dataset),
+            args.tokenizer,
+            args.trust_remote_code,
+            args.num_prompts,
+            args.prompt_len_limit,
+            args.seed,
+        ),
+        create_requests,
+        use_cache=not args.no_cache,
     )
 
     logger.info("Benchmark starts.")
@@ -121,6 +189,15 @@ def main(args: argparse.Namespace):
         concurrency=args.concurrency,
         api_key=args.api_key,
         print_error=args.print_error,
+        latency_threshold=(
+            args.latency_threshold_ms / 1000
+            if args.adaptive_concurrency
+            else None
+        ),
+        hedge_delay=(
+            args.hedge_delay_ms / 1000 if args.hedge_delay_ms is not None else None
+        ),
+        seed=args.seed,
     )
     asyncio.run(benchmark.run())
 
@@ -182,5 +259,29 @@ if __name__ == "__main__":
         action="store_true",
         help="Print detailed error messages if any errors encountered."
     )
+    parser.add_argument(
+        "--adaptive-concurrency",
+        action="store_true",
+        help="Adapt the number of in-flight requests (up to --concurrency) "
+        "to the server's latency instead of keeping it fixed.",
+    )
+    parser.add_argument(
+        "--latency-threshold-ms",
+        type=float,
+        default=10000,
+        help="Request latency above which adaptive concurrency backs off.",
+    )
+    parser.add_argument(
+        "--hedge-delay-ms",
+        type=float,
+        default=None,
+        help="Send a backup request if a request has not completed after "
+        "this delay, and keep whichever completes first.",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Do not load or save the tokenized requests cached on disk.",
+    )
     args = parser.parse_args()
     main(args)
@@ -12,10 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import hashlib
 import json
 import logging
+import os
 import random
-from typing import TYPE_CHECKING, List, Tuple
+from typing import TYPE_CHECKING, Callable, List, Tuple
 
 from transformers import AutoTokenizer, PreTrainedTokenizerFast
 
@@ -165,3 +167,39 @@ def generate_sorting_prompts(
         prompt_len = len(prompt_token_ids[i])
         dataset.append((prompts[i], prompt_len, context_length - prompt_len))
     return dataset
+
+
+def file_fingerprint(path: str) -> Tuple[str, int, int]:
+    """Identify a file by its path, size and modification time."""
+    stat = os.stat(path)
+    return os.path.abspath(path), stat.st_size, stat.st_mtime_ns
+
+
+def load_cached_requests(
+    key: tuple,
+    create: Callable[[], List[Tuple[str, int, int]]],
+    use_cache: bool = True,
+) -> List[Tuple[str, int, int]]:
+    """
+    Load the requests cached on disk under `key`, or call `create` and cache
+    its result, so that the dataset is tokenized only once across runs."""
+    if not use_cache:
+        return create()
+
+    # A per-user directory, and plain JSON rather than pickle, so that a file
+    # planted by someone else can neither be picked up nor run code.
+    cache_dir = os.path.join(os.path.expanduser("~"), ".cache", "xinference_benchmark")
+    os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+    digest = hashlib.sha256(repr(key).encode("utf-8")).hexdigest()
+    path = os.path.join(cache_dir, f"{digest}.json")
+    if os.path.exists(path):
+        logger.info(f"Loading cached requests from {path}.")
+        with open(path, "r", encoding="utf-8") as f:
+            return [tuple(request) for request in json.load(f)]  # type: ignore
+
+    requests = create()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(requests, f)
+    os.replace(tmp_path, path)
+    return requests
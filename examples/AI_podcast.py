@@ -19,7 +19,6 @@ import queue
 import re
 import subprocess
 import sys
-import tempfile
 import time
 import warnings
 from typing import List
@@ -27,14 +26,6 @@ from typing import List
 warnings.filterwarnings("ignore")
 
 
-try:
-    import ffmpeg
-except ImportError:
-    raise ImportError(
-        "Failed to import ffmpeg, please install ffmpeg with `brew install ffmpeg & pip install"
-        " ffmpeg`"
-    )
-
 try:
     import sounddevice as sd
 except ImportError:
@@ -42,13 +33,6 @@ except ImportError:
         "Failed to import sounddevice, please install sounddevice with `pip install sounddevice`"
     )
 
-try:
-    import soundfile as sf
-except:
-    raise ImportError(
-        "Failed to import soundfile, please install soundfile with `pip install soundfile`"
-    )
-
 try:
     import emoji
 except ImportError:
@@ -86,6 +70,8 @@ except ImportError:
 logger = logging.getLogger(__name__)
 # global variable to store the audio device choices.
 audio_devices = "-1"
+# sample rate of the audio fed to whisper.
+WHISPER_SAMPLE_RATE = 16000
 
 # ----------------------------------------- decorator libraries ----------------------------------------------------- #
 emoji_man = "\U0001F9D4"
@@ -133,35 +119,48 @@ def record_unlimited() -> numpy.ndarray:
     print("-" * terminal_size.columns)
     print(emoji_speaking, end="")
     input("  Press Enter to start talking and press Ctrl+C to stop the recording:")
-    filename = tempfile.mktemp(prefix="delme_rec_unlimited_", suffix=".wav", dir="")
+    # drop the blocks left over from the previous recording.
+    while not q.empty():
+        q.get_nowait()
+    # Whisper expects 16 kHz mono audio, record at that rate if the device supports it,
+    # which avoids writing a wav file and decoding it again with ffmpeg.
+    samplerate = WHISPER_SAMPLE_RATE
+    try:
+        sd.check_input_settings(
+            device=user_device, channels=1, dtype="float32", samplerate=samplerate
+        )
+    except Exception:
+        samplerate = 48000
+    chunks = []
     try:
-        # Make sure the file is opened before recording anything:
-        with sf.SoundFile(filename, mode="x", samplerate=48000, channels=1) as file:
-            with sd.InputStream(
-                samplerate=48000, device=user_device, channels=1, callback=callback
-            ):
-                while True:
-                    file.write(q.get())
+        with sd.InputStream(
+            samplerate=samplerate,
+            device=user_device,
+            channels=1,
+            dtype="float32",
+            callback=callback,
+        ):
+            while True:
+                chunks.append(q.get())
     except KeyboardInterrupt:
         pass
     except Exception as e:
         print(type(e).__name__ + ": " + str(e))
 
-    try:
-        y, _ = (
-            ffmpeg.input(os.path.abspath(filename), threads=0)
-            .output("-", format="s16le", acodec="pcm_s16le", ac=1, ar=16000)
-            .run(cmd=["ffmpeg", "-nostdin"], capture_stdout=True, capture_stderr=True)
-        )
-    except ffmpeg.Error as e:
-        raise RuntimeError(f"Failed to load audio: {e.stderr.decode()}") from e
-    os.remove(filename)
-    return numpy.frombuffer(y, numpy.int16).flatten().astype(numpy.float32) / 32768.0
+    if not chunks:
+        return numpy.zeros(0, dtype=numpy.float32)
+    audio = numpy.concatenate(chunks, axis=0).reshape(-1)
+    if samplerate != WHISPER_SAMPLE_RATE:
+        from scipy.signal import resample_poly
+
+        audio = resample_poly(audio, 1, samplerate // WHISPER_SAMPLE_RATE)
+    return audio.astype(numpy.float32, copy=False)
 
 
 def format_prompt(model, audio_input) -> str:
-    # the second parameters of transcribe enable us to define the language we are speaking.
-    return model.transcribe(audio_input)["text"]
+    # the second parameters of transcribe enable us to define the language we are speaking,
+    # which skips the language detection on every turn.
+    return model.transcribe(audio_input, language="en")["text"]
 
 
 # transcript the generated chatbot word to audio output so the user will hear the result.
@@ -216,6 +215,13 @@ if __name__ == "__main__":
     parser.add_argument(
         "-e", "--endpoint", type=str, help="Xinference endpoint, required", required=True
     )
+    parser.add_argument(
+        "-wm",
+        "--whisper-model",
+        type=str,
+        help="Whisper model used to transcribe the speech, e.g. base.en or small.en",
+        default="medium",
+    )
     args = parser.parse_args()
 
     endpoint = args.endpoint
@@ -279,8 +285,9 @@ if __name__ == "__main__":
     )
     system_prompt_bob = system_prompt_alice
 
-    # we can change the scale of the model here, the bigger the model, the higher the accuracy.
-    model = whisper.load_model("medium")
+    # we can change the scale of the model with `--whisper-model`, the bigger the model,
+    # the higher the accuracy. English-only models (*.en) are faster for English speech.
+    model = whisper.load_model(args.whisper_model)
 
     welcome_prompt2 = (
         f": Nice to meet you, {username}. Hope you will enjoy the conversation with our AI agents"
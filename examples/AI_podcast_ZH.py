@@ -16,10 +16,13 @@ import logging
 import os
 import queue
 import re
+import subprocess
 import sys
 import tempfile
+import threading
 import time
 import warnings
+from concurrent.futures import Future, ThreadPoolExecutor
 from typing import Iterator
 
 from xinference.model.llm.pytorch.core import PytorchGenerateConfig
@@ -33,14 +36,6 @@ except ImportError:
         "Failed to import opencc, please install opencc with `pip install opencc-python-reimplemented"
     )
 
-try:
-    import ffmpeg
-except ImportError:
-    raise ImportError(
-        "Failed to import ffmpeg, please install ffmpeg with `brew install ffmpeg & pip install"
-        " ffmpeg`"
-    )
-
 try:
     import sounddevice as sd
 except ImportError:
@@ -48,13 +43,6 @@ except ImportError:
         "Failed to import sounddevice, please install sounddevice with `pip install sounddevice`"
     )
 
-try:
-    import soundfile as sf
-except:
-    raise ImportError(
-        "Failed to import soundfile, please install soundfile with `pip install soundfile`"
-    )
-
 try:
     import emoji
 except ImportError:
@@ -71,13 +59,20 @@ except ImportError:
         "correct package at https://pypi.org/project/numpy/1.24.1/"
     )
 
+# faster-whisper runs the int8 quantized model on CTranslate2, which transcribes
+# much faster than the reference implementation, fall back to the latter if missing.
 try:
-    import whisper
+    import ctranslate2
+    from faster_whisper import WhisperModel
 except ImportError:
-    raise ImportError(
-        "Failed to import whisper, please check the "
-        "correct package at https://pypi.org/project/openai-whisper/"
-    )
+    WhisperModel = None
+    try:
+        import whisper
+    except ImportError:
+        raise ImportError(
+            "Failed to import whisper, please check the correct package at "
+            "https://pypi.org/project/faster-whisper/ or https://pypi.org/project/openai-whisper/"
+        )
 
 try:
     from xinference.client import RESTfulClient
@@ -93,6 +88,10 @@ warnings.filterwarnings("ignore")
 logger = logging.getLogger(__name__)
 # global variable to store the audio device choices.
 audio_devices = "-1"
+# sample rate of the audio fed to whisper.
+WHISPER_SAMPLE_RATE = 16000
+# split the chatbot words after the end of each sentence.
+SENTENCE_END_RE = re.compile(r"(?<=[。！？!?\n])")
 
 # ----------------------------------------- decorator libraries ----------------------------------------------------- #
 emoji_man = "\U0001F467"
@@ -143,37 +142,50 @@ def record_unlimited() -> numpy.ndarray:
     print("-" * terminal_size.columns)
     print(emoji_speaking, end="")
     input("  输入 Enter 键位开始录音，随后输入 Ctrl + C 停止录音:")
-    filename = tempfile.mktemp(prefix="delme_rec_unlimited_", suffix=".wav", dir="")
+    # don't record the voice of the chatbot.
+    wait_for_audio()
+    # drop the blocks left over from the previous recording.
+    while not q.empty():
+        q.get_nowait()
+    # Whisper expects 16 kHz mono audio, record at that rate if the device supports it.
+    samplerate = WHISPER_SAMPLE_RATE
+    try:
+        sd.check_input_settings(
+            device=user_device, channels=1, dtype="float32", samplerate=samplerate
+        )
+    except Exception:
+        samplerate = 48000
+    chunks = []
     try:
-        # Make sure the file is opened before recording anything:
-        with sf.SoundFile(filename, mode="x", samplerate=48000, channels=1) as file:
-            with sd.InputStream(
-                samplerate=48000, device=user_device, channels=1, callback=callback
-            ):
-                while True:
-                    file.write(q.get())
+        with sd.InputStream(
+            samplerate=samplerate,
+            device=user_device,
+            channels=1,
+            dtype="float32",
+            callback=callback,
+        ):
+            while True:
+                chunks.append(q.get())
     except KeyboardInterrupt:
         pass
     except Exception as e:
         print(type(e).__name__ + ": " + str(e))
 
-    try:
-        y, _ = (
-            ffmpeg.input(os.path.abspath(filename), threads=0)
-            .output("-", format="s16le", acodec="pcm_s16le", ac=1, ar=16000)
-            .run(cmd=["ffmpeg", "-nostdin"], capture_stdout=True, capture_stderr=True)
-        )
-    except ffmpeg.Error as e:
-        raise RuntimeError(f"Failed to load audio: {e.stderr.decode()}") from e
-    os.remove(filename)
-    return numpy.frombuffer(y, numpy.int16).flatten().astype(numpy.float32) / 32768.0
+    if not chunks:
+        return numpy.zeros(0, dtype=numpy.float32)
+    audio = numpy.concatenate(chunks, axis=0).reshape(-1)
+    if samplerate != WHISPER_SAMPLE_RATE:
+        from scipy.signal import resample_poly
+
+        audio = resample_poly(audio, 1, samplerate // WHISPER_SAMPLE_RATE)
+    return audio.astype(numpy.float32, copy=False)
 
 
 # ======================== for all the content below, alice refers to 小红，bob refers to 小花 ======================== #
 
 
 # Launch model while sent the greeting message to the user.
-def lanuch_model(alice_or_bob, model_a, username, model_uid, system_prompt):
+def lanuch_model(alice_or_bob, model_a, username, model, model_uid, system_prompt):
     if alice_or_bob == "小红":
         emoji_assistant = emoji_women
     else:
@@ -189,8 +201,6 @@ def lanuch_model(alice_or_bob, model_a, username, model_uid, system_prompt):
     print(f"{emoji_rocket} 启动模型 {model_a}。初次下载需要的时间可能会比较长。")
     print("-" * terminal_size.columns)
 
-    model = client.get_model(model_uid)
-
     if alice_or_bob == "小红":
         prompt = f"你好，{alice_or_bob}！"
     else:
@@ -210,19 +220,105 @@ def lanuch_model(alice_or_bob, model_a, username, model_uid, system_prompt):
     return model, model_uid
 
 
+def load_whisper_model(name: str):
+    if WhisperModel is None:
+        return whisper.load_model(name)
+    if ctranslate2.get_cuda_device_count() > 0:
+        return WhisperModel(name, device="cuda", compute_type="int8_float16")
+    return WhisperModel(name, device="cpu", compute_type="int8")
+
+
 def format_prompt(model, audio_input) -> str:
-    # the second parameters of transcribe enable us to define the language we are speaking.
+    # the second parameters of transcribe enable us to define the language we are speaking,
+    # which skips the language detection.
+    if WhisperModel is not None:
+        segments, _ = model.transcribe(audio_input, language="zh")
+        return "".join(segment.text for segment in segments)
     return model.transcribe(audio_input, language="zh")["text"]
 
 
+# transcribe the recordings of all the turns on one dedicated thread, which loads the
+# whisper model in the background, so that loading overlaps with the greetings.
+class Transcriber:
+    def __init__(self, model_name: str):
+        self._requests: queue.Queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, args=(model_name,), daemon=True
+        )
+        self._thread.start()
+
+    def _run(self, model_name: str):
+        model, load_error = None, None
+        try:
+            model = load_whisper_model(model_name)
+        except Exception as e:
+            load_error = e
+        while True:
+            audio_input, future = self._requests.get()
+            if not future.set_running_or_notify_cancel():
+                continue
+            if load_error is not None:
+                future.set_exception(load_error)
+                continue
+            try:
+                future.set_result(format_prompt(model, audio_input))
+            except Exception as e:
+                future.set_exception(e)
+
+    def submit(self, audio_input) -> Future:
+        future: Future = Future()
+        self._requests.put((audio_input, future))
+        return future
+
+
+# the thread which may be still speaking, so that the next turn can go on meanwhile.
+pending_audio = None
+
+
+# wait until the previous audio output is completed.
+def wait_for_audio():
+    global pending_audio
+
+    if pending_audio is not None:
+        pending_audio.join()
+        pending_audio = None
+
+
+# speak the sentences one by one, while a sentence is playing, the audio of the next one
+# is synthesized, so that the first sentence is heard early and there is no gap between them.
+def speak_sentences(sentences, voice):
+    with tempfile.TemporaryDirectory() as tmpdir:
+
+        def synthesize(i):
+            path = os.path.join(tmpdir, f"{i}.aiff")
+            return path, subprocess.Popen(["say", "-v", voice, "-o", path, sentences[i]])
+
+        player = None
+        path, synthesizer = synthesize(0)
+        for i in range(len(sentences)):
+            synthesizer.wait()
+            current_path = path
+            if i + 1 < len(sentences):
+                path, synthesizer = synthesize(i + 1)
+            if player is not None:
+                player.wait()
+            player = subprocess.Popen(["afplay", current_path])
+        player.wait()
+
+
 # transcript the generated chatbot word to audio output so the user will hear the result.
 def text_to_audio(response, voice_id):
+    global pending_audio
+
     # for audio output, we apply the mac initiated "say" command to provide. For Windows users, if you want
     # audio output, you can try on pyttsx3 or gtts package to see their functionality!
-    import subprocess
 
-    # Text to convert to speech
-    text = response
+    # Text to convert to speech, split into sentences.
+    sentences = [
+        sentence for sentence in SENTENCE_END_RE.split(response) if sentence.strip()
+    ]
+    if not sentences:
+        return None
     if voice_id == "小红":
         voice = "Mei-Jia"
     elif voice_id == "小花":
@@ -230,9 +326,13 @@ def text_to_audio(response, voice_id):
     # anything not belongs to alice or bob are said by system voice.
     else:
         voice = "Ting-ting"
-    # Execute the "say" command and wait the command to be completed.
-    process = subprocess.Popen(["say", "-v", voice, text])
-    process.wait()
+    # Only one voice speaks at a time, then speak without waiting it to be completed.
+    wait_for_audio()
+    pending_audio = threading.Thread(
+        target=speak_sentences, args=(sentences, voice), daemon=True
+    )
+    pending_audio.start()
+    return pending_audio
 
 
 # Construct Baichuan Compatible Chat prompt.
@@ -302,6 +402,23 @@ def _convert_completion_to_chat(completion: Completion) -> ChatCompletion:
     }
 
 
+def _recent_history(chat_history, history_window):
+    """
+    Keep the most recent rounds of `chat_history`, a list of alternating user and
+    assistant messages. The window start only moves forward every
+    `history_window` rounds, so consecutive prompts share the same prefix and the
+    model can reuse its prefix cache. Once the chat has `history_window` rounds,
+    between `history_window` and `2 * history_window - 1` rounds are kept.
+
+    >>> history = [f"m{i}" for i in range(2 * 9)]
+    >>> [len(_recent_history(history[: 2 * r], 3)) // 2 for r in range(1, 10)]
+    [1, 2, 3, 4, 5, 3, 4, 5, 3]
+    """
+    rounds = len(chat_history) // 2
+    window_start = max((rounds - history_window) // history_window, 0)
+    return chat_history[2 * window_start * history_window :]
+
+
 def chat_with_bot(
     format_input,
     chat_history,
@@ -309,13 +426,20 @@ def chat_with_bot(
     system_prompt,
     model_ref,
     usname,
+    history_window=None,
 ):
+    # only send the recent rounds of the chat to the model, so the prompt does not
+    # keep growing with the conversation. The system prompt is kept.
+    recent_history = chat_history
+    if history_window is not None and history_window > 0:
+        recent_history = _recent_history(chat_history, history_window)
+
     full_prompt = construct_Baichuan_prompt(
         prompt=format_input,
         system_prompt=system_prompt,
         username=usname,
         assistant_name=alice_or_bob_state,
-        chat_history=chat_history,
+        chat_history=recent_history,
     )
 
     pytorch_generate_config = baichuan_sanitize_generate_config()
@@ -344,6 +468,19 @@ def chat_with_bot(
     return content
 
 
+# check whether 小红 and 小花 are both in the prompt and their position:
+def check_word_order(string, first_word, second_word) -> int:
+    # Chinese text is not separated by spaces, so look for the names
+    # as substrings rather than splitting the string into words.
+    first_position = string.find(first_word)
+    second_position = string.find(second_word)
+
+    if first_position == -1 or second_position == -1:
+        return -1  # Either of the words is not present in the string
+
+    return 1 if first_position < second_position else 2
+
+
 # ---------------------------------------- The program will run from below: ------------------------------------------#
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
@@ -369,6 +506,14 @@ if __name__ == "__main__":
         help="Xinference model 2's model uid",
         required=True,
     )
+    parser.add_argument(
+        "-w",
+        "--history-window",
+        type=int,
+        help="Minimum number of recent chat rounds sent to the models, up to "
+        "twice as many minus one are sent; all by default",
+        default=None,
+    )
     args = parser.parse_args()
 
     endpoint = args.endpoint
@@ -380,6 +525,10 @@ if __name__ == "__main__":
     # Specify the first model we need
     client = RESTfulClient(endpoint)
 
+    # We can change the scale of the model here, the bigger the model, the higher the accuracy
+    # Due to the machine restrictions, I can only launch smaller model.
+    transcriber = Transcriber("medium")
+
     # chat history to store every words each member is saying.
     chat_history = []
 
@@ -417,13 +566,23 @@ if __name__ == "__main__":
     )
     system_prompt_bob = system_prompt_alice
 
-    # launch the two model one by one and let them greet with the user.
-    # first set up two model ready for serve on the server, and then
-    # retrieve them by model_uid on client side.
+    # the two model are set up on the server already, retrieve them by
+    # model_uid on client side concurrently, and only once if both chatbots
+    # are served by the same model.
+    with ThreadPoolExecutor(2) as executor:
+        model_1_future = executor.submit(client.get_model, model_1_uid)
+        if model_2_uid == model_1_uid:
+            model_2_future = model_1_future
+        else:
+            model_2_future = executor.submit(client.get_model, model_2_uid)
+        model_1, model_2 = model_1_future.result(), model_2_future.result()
+
+    # let the two model greet with the user one by one.
     model_a_ref, model_a_uid = lanuch_model(
         alice_or_bob="小红",
         model_a=model_a,
         username=username,
+        model=model_1,
         model_uid=model_1_uid,
         system_prompt=system_prompt_alice,
     )
@@ -431,19 +590,16 @@ if __name__ == "__main__":
         alice_or_bob="小花",
         model_a=model_a,
         username=username,
+        model=model_2,
         model_uid=model_2_uid,
         system_prompt=system_prompt_bob,
     )
 
-    # We can change the scale of the model here, the bigger the model, the higher the accuracy
-    # Due to the machine restrictions, I can only launch smaller model.
-    model = whisper.load_model("medium")
-
     while True:
         audio_input = record_unlimited()
 
         start = time.time()
-        raw_format_input = format_prompt(model, audio_input)
+        raw_format_input = transcriber.submit(audio_input).result()
         logger.info(f"Time spent on transcribing: {time.time() - start}")
 
         # turn traditional chinese to simplified chinese.
@@ -452,10 +608,11 @@ if __name__ == "__main__":
         )  # 't2s.json' represents the conversion configuration file
         format_input = converter.convert(raw_format_input)
 
-        if "小宏" in format_input.lower():
+        if "小宏" in format_input:
             format_input = format_input.replace("小宏", "小红")
-        elif "小洪" in format_input.lower():
+        elif "小洪" in format_input:
             format_input = format_input.replace("小洪", "小红")
+        format_input_lower = format_input.lower()
 
         # set up the separation between each chat block.
         print("")
@@ -465,11 +622,11 @@ if __name__ == "__main__":
         print(format_input)
 
         # for un-natural exit audio inputs.
-        if "离开" in format_input.lower() or "退出" in format_input.lower():
+        if "离开" in format_input_lower or "退出" in format_input_lower:
             break
 
         # for natural exit, both bot is expected to send greeting message.
-        if "拜拜" in format_input.lower() or "再见" in format_input.lower():
+        if "拜拜" in format_input_lower or "再见" in format_input_lower:
             alice_or_bob_state = "小红"
             content_alice = f": 很高兴能与你交谈, {username}，再见！"
             print(emoji_women, end="")
@@ -486,37 +643,21 @@ if __name__ == "__main__":
         # We choose to set 小红 to default
         model_ref = model_a_ref
 
-        # check whether 小红 and 小花 are both in the prompt and their position:
-        def check_word_order(string, first_word, second_word) -> int:
-            words = re.findall(
-                r"\b\w+\b", string
-            )  # Split the string into words, excluding punctuation
-
-            if first_word in words and second_word in words:
-                first_position = words.index(first_word)
-                second_position = words.index(second_word)
-
-                if first_position < second_position:
-                    return 1
-                if first_position > second_position:
-                    return 2
-
-            return -1  # Either of the words is not present in the string
-
-        if check_word_order(format_input.lower(), "小红", "小花") == 1:
+        word_order = check_word_order(format_input_lower, "小红", "小花")
+        if word_order == 1:
             alice_or_bob_state = "小红"
             system_prompt = system_prompt_alice
             model_ref = model_a_ref
-        elif check_word_order(format_input.lower(), "小红", "小花") == 2:
+        elif word_order == 2:
             alice_or_bob_state = "小花"
             system_prompt = system_prompt_bob
             model_ref = model_b_ref
         else:
-            if "小红" in format_input.lower():
+            if "小红" in format_input_lower:
                 alice_or_bob_state = "小红"
                 system_prompt = system_prompt_alice
                 model_ref = model_a_ref
-            elif "小花" in format_input.lower():
+            elif "小花" in format_input_lower:
                 alice_or_bob_state = "小花"
                 system_prompt = system_prompt_bob
                 model_ref = model_b_ref
@@ -538,6 +679,7 @@ if __name__ == "__main__":
                 system_prompt=system_prompt,
                 model_ref=model_ref,
                 usname=username,
+                history_window=args.history_window,
             )
         else:
             content = chat_with_bot(
@@ -547,6 +689,7 @@ if __name__ == "__main__":
                 system_prompt=system_prompt,
                 model_ref=model_ref,
                 usname=username,
+                history_window=args.history_window,
             )
 
         text_to_audio(content, alice_or_bob_state)
@@ -562,3 +705,4 @@ if __name__ == "__main__":
     print(bye_msg2)
     text_to_audio(bye_msg1, "0")
     text_to_audio(bye_msg2, "0")
+    wait_for_audio()
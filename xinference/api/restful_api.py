@@ -219,6 +219,8 @@ class RESTfulAPI:
         self._host = host
         self._port = port
         self._supervisor_ref = None
+        # created lazily so that it binds to the serving event loop
+        self._supervisor_ref_lock: Optional[asyncio.Lock] = None
         self._event_collector_ref = None
         self._auth_service = AuthService(auth_config_file)
         self._router = APIRouter()
@@ -234,9 +236,15 @@ class RESTfulAPI:
 
     async def _get_supervisor_ref(self) -> xo.ActorRefType[SupervisorActor]:
         if self._supervisor_ref is None:
-            self._supervisor_ref = await xo.actor_ref(
-                address=self._supervisor_address, uid=SupervisorActor.default_uid()
-            )
+            if self._supervisor_ref_lock is None:
+                self._supervisor_ref_lock = asyncio.Lock()
+            # concurrent first requests share a single actor_ref lookup
+            async with self._supervisor_ref_lock:
+                if self._supervisor_ref is None:
+                    self._supervisor_ref = await xo.actor_ref(
+                        address=self._supervisor_address,
+                        uid=SupervisorActor.default_uid(),
+                    )
         return self._supervisor_ref
 
     async def _get_event_collector_ref(self) -> xo.ActorRefType[EventCollectorActor]:
@@ -872,9 +880,13 @@ class RESTfulAPI:
             logger.error(e, exc_info=True)
             raise HTTPException(status_code=500, detail=str(e))
 
-    async def list_models(self) -> JSONResponse:
+    async def list_models(self, request: Request) -> Response:
         try:
-            models = await (await self._get_supervisor_ref()).list_models()
+            supervisor_ref = await self._get_supervisor_ref()
+            etag = f'"{await supervisor_ref.get_models_version()}"'
+            if request.headers.get("if-none-match") == etag:
+                return Response(status_code=304, headers={"ETag": etag})
+            models = await supervisor_ref.list_models()
 
             model_list = []
             for model_id, model_info in models.items():
@@ -889,7 +901,7 @@ class RESTfulAPI:
                 )
             response = {"object": "list", "data": model_list}
 
-            return JSONResponse(content=response)
+            return JSONResponse(content=response, headers={"ETag": etag})
         except Exception as e:
             logger.error(e, exc_info=True)
             raise HTTPException(status_code=500, detail=str(e))
@@ -15,6 +15,29 @@
 import json
 from typing import Any, Iterator
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def json_dumps(obj: Any) -> bytes:
+    """
+    Serialize a request body, with orjson when it is installed.
+    """
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj)
+        except TypeError:
+            pass
+    return json.dumps(obj).encode("utf-8")
+
+
+def json_loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
 
 def streaming_response_iterator(
     response_lines: Iterator[bytes],
@@ -45,7 +68,7 @@ def streaming_response_iterator(
             json_str = line[len(b"data:") :].strip()
             if json_str == b"[DONE]":
                 continue
-            data = json.loads(json_str.decode("utf-8"))
+            data = json_loads(json_str)
             error = data.get("error")
             if error is not None:
                 raise Exception(str(error))
@@ -13,11 +13,14 @@
 # limitations under the License.
 import json
 import typing
-from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import requests
 
-from ..common import streaming_response_iterator
+from ..common import json_dumps, json_loads, streaming_response_iterator
+
+# max number of connections kept alive per host, shared by the threads using a client.
+_HTTP_POOL_SIZE = 40
 
 if TYPE_CHECKING:
     from ...types import (
@@ -58,23 +61,40 @@ def _get_error_string(response: requests.Response) -> str:
     return "Unknown error"
 
 
+def _create_session() -> requests.Session:
+    """
+    Create a session that keeps connections to the server alive and pools them,
+    so that consecutive requests skip the TCP handshake.
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(
+        pool_connections=_HTTP_POOL_SIZE, pool_maxsize=_HTTP_POOL_SIZE
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
 @typing.no_type_check
 def handle_system_prompts(
     chat_history: List["ChatCompletionMessage"], system_prompt: Optional[str]
 ) -> List["ChatCompletionMessage"]:
-    history_system_prompts = [
-        ch["content"] for ch in chat_history if ch["role"] == "system"
-    ]
+    # split out the system prompts in one pass, without touching the caller's list
+    history_system_prompts = []
+    messages = []
+    for ch in chat_history:
+        if ch["role"] == "system":
+            history_system_prompts.append(ch["content"])
+        else:
+            messages.append(ch)
     if system_prompt is not None:
         history_system_prompts.append(system_prompt)
 
-    # remove all the system prompt in the chat_history
-    chat_history = list(filter(lambda x: x["role"] != "system", chat_history))
-    # insert all system prompts at the beginning
-    chat_history.insert(
-        0, {"role": "system", "content": ". ".join(history_system_prompts)}
-    )
-    return chat_history
+    # put all system prompts at the beginning
+    return [
+        {"role": "system", "content": ". ".join(history_system_prompts)},
+        *messages,
+    ]
 
 
 class RESTfulModelHandle:
@@ -83,10 +103,17 @@ class RESTfulModelHandle:
     programmatically.
     """
 
-    def __init__(self, model_uid: str, base_url: str, auth_headers: Dict):
+    def __init__(
+        self,
+        model_uid: str,
+        base_url: str,
+        auth_headers: Dict,
+        session: Optional[requests.Session] = None,
+    ):
         self._model_uid = model_uid
         self._base_url = base_url
         self.auth_headers = auth_headers
+        self.session = session if session is not None else _create_session()
 
 
 class RESTfulEmbeddingModelHandle(RESTfulModelHandle):
@@ -117,7 +144,7 @@ class RESTfulEmbeddingModelHandle(RESTfulModelHandle):
             "input": input,
         }
         request_body.update(kwargs)
-        response = requests.post(url, json=request_body, headers=self.auth_headers)
+        response = self.session.post(url, json=request_body, headers=self.auth_headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to create the embeddings, detail: {_get_error_string(response)}"
@@ -176,10 +203,10 @@ class RESTfulRerankModelHandle(RESTfulModelHandle):
             "return_len": return_len,
         }
         request_body.update(kwargs)
-        response = requests.post(url, json=request_body, headers=self.auth_headers)
+        response = self.session.post(url, json=request_body, headers=self.auth_headers)
         if response.status_code != 200:
             raise RuntimeError(
-                f"Failed to rerank documents, detail: {response.json()['detail']}"
+                f"Failed to rerank documents, detail: {_get_error_string(response)}"
             )
         response_data = response.json()
         return response_data
@@ -221,7 +248,7 @@ class RESTfulImageModelHandle(RESTfulModelHandle):
             "response_format": response_format,
             "kwargs": json.dumps(kwargs),
         }
-        response = requests.post(url, json=request_body, headers=self.auth_headers)
+        response = self.session.post(url, json=request_body, headers=self.auth_headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to create the images, detail: {_get_error_string(response)}"
@@ -285,7 +312,7 @@ class RESTfulImageModelHandle(RESTfulModelHandle):
         for key, value in params.items():
             files.append((key, (None, value)))
         files.append(("image", ("image", image, "application/octet-stream")))
-        response = requests.post(url, files=files, headers=self.auth_headers)
+        response = self.session.post(url, files=files, headers=self.auth_headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to variants the images, detail: {_get_error_string(response)}"
@@ -360,7 +387,7 @@ class RESTfulImageModelHandle(RESTfulModelHandle):
         files.append(
             ("mask_image", ("mask_image", mask_image, "application/octet-stream"))
         )
-        response = requests.post(url, files=files, headers=self.auth_headers)
+        response = self.session.post(url, files=files, headers=self.auth_headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to inpaint the images, detail: {_get_error_string(response)}"
@@ -398,7 +425,7 @@ class RESTfulVideoModelHandle(RESTfulModelHandle):
             "n": n,
             "kwargs": json.dumps(kwargs),
         }
-        response = requests.post(url, json=request_body, headers=self.auth_headers)
+        response = self.session.post(url, json=request_body, headers=self.auth_headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to create the video, detail: {_get_error_string(response)}"
@@ -451,8 +478,11 @@ class RESTfulGenerateModelHandle(RESTfulModelHandle):
 
         stream = bool(generate_config and generate_config.get("stream"))
 
-        response = requests.post(
-            url, json=request_body, stream=stream, headers=self.auth_headers
+        response = self.session.post(
+            url,
+            data=json_dumps(request_body),
+            stream=stream,
+            headers={**self.auth_headers, "Content-Type": "application/json"},
         )
         if response.status_code != 200:
             raise RuntimeError(
@@ -462,7 +492,7 @@ class RESTfulGenerateModelHandle(RESTfulModelHandle):
         if stream:
             return streaming_response_iterator(response.iter_lines())
 
-        response_data = response.json()
+        response_data = json_loads(response.content)
         return response_data
 
 
@@ -515,8 +545,11 @@ class RESTfulChatModelHandle(RESTfulGenerateModelHandle):
                 request_body[key] = value
 
         stream = bool(generate_config and generate_config.get("stream"))
-        response = requests.post(
-            url, json=request_body, stream=stream, headers=self.auth_headers
+        response = self.session.post(
+            url,
+            data=json_dumps(request_body),
+            stream=stream,
+            headers={**self.auth_headers, "Content-Type": "application/json"},
         )
 
         if response.status_code != 200:
@@ -527,7 +560,7 @@ class RESTfulChatModelHandle(RESTfulGenerateModelHandle):
         if stream:
             return streaming_response_iterator(response.iter_lines())
 
-        response_data = response.json()
+        response_data = json_loads(response.content)
         return response_data
 
 
@@ -584,7 +617,7 @@ class RESTfulAudioModelHandle(RESTfulModelHandle):
         }
         files: List[Any] = []
         files.append(("file", ("file", audio, "application/octet-stream")))
-        response = requests.post(
+        response = self.session.post(
             url, data=params, files=files, headers=self.auth_headers
         )
         if response.status_code != 200:
@@ -647,7 +680,7 @@ class RESTfulAudioModelHandle(RESTfulModelHandle):
         }
         files: List[Any] = []
         files.append(("file", ("file", audio, "application/octet-stream")))
-        response = requests.post(
+        response = self.session.post(
             url, data=params, files=files, headers=self.auth_headers
         )
         if response.status_code != 200:
@@ -708,11 +741,11 @@ class RESTfulAudioModelHandle(RESTfulModelHandle):
                     ("prompt_speech", prompt_speech, "application/octet-stream"),
                 )
             )
-            response = requests.post(
+            response = self.session.post(
                 url, data=params, files=files, headers=self.auth_headers, stream=stream
             )
         else:
-            response = requests.post(
+            response = self.session.post(
                 url, json=params, headers=self.auth_headers, stream=stream
             )
         if response.status_code != 200:
@@ -752,7 +785,7 @@ class RESTfulFlexibleModelHandle(RESTfulModelHandle):
         }
         params.update(kwargs)
 
-        response = requests.post(url, json=params, headers=self.auth_headers)
+        response = self.session.post(url, json=params, headers=self.auth_headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to predict, detail: {_get_error_string(response)}"
@@ -764,12 +797,27 @@ class RESTfulFlexibleModelHandle(RESTfulModelHandle):
 class Client:
     def __init__(self, base_url, api_key: Optional[str] = None):
         self.base_url = base_url
+        self.session = _create_session()
         self._headers: Dict[str, str] = {}
         self._cluster_authed = False
+        # (etag, models) of the last list_models response
+        self._models_cache: Optional[Tuple[str, Dict[str, Dict[str, Any]]]] = None
         self._check_cluster_authenticated()
         if api_key is not None and self._cluster_authed:
             self._headers["Authorization"] = f"Bearer {api_key}"
 
+    def close(self):
+        """
+        Close the pooled connections held by this client and its model handles.
+        """
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
     def _set_token(self, token: Optional[str]):
         if not self._cluster_authed or token is None:
             return
@@ -784,24 +832,24 @@ class Client:
 
     def _check_cluster_authenticated(self):
         url = f"{self.base_url}/v1/cluster/auth"
-        response = requests.get(url)
+        response = self.session.get(url)
         # compatible with old version of xinference
         if response.status_code == 404:
             self._cluster_authed = False
         else:
             if response.status_code != 200:
                 raise RuntimeError(
-                    f"Failed to get cluster information, detail: {response.json()['detail']}"
+                    f"Failed to get cluster information, detail: {_get_error_string(response)}"
                 )
             response_data = response.json()
             self._cluster_authed = bool(response_data["auth"])
 
     def vllm_models(self) -> Dict[str, Any]:
         url = f"{self.base_url}/v1/models/vllm-supported"
-        response = requests.get(url, headers=self._headers)
+        response = self.session.get(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
-                f"Failed to fetch VLLM models. detail: {response.json()['detail']}"
+                f"Failed to fetch VLLM models. detail: {_get_error_string(response)}"
             )
 
         try:
@@ -816,9 +864,11 @@ class Client:
 
         payload = {"username": username, "password": password}
 
-        response = requests.post(url, json=payload)
+        response = self.session.post(url, json=payload)
         if response.status_code != 200:
-            raise RuntimeError(f"Failed to login, detail: {response.json()['detail']}")
+            raise RuntimeError(
+                f"Failed to login, detail: {_get_error_string(response)}"
+            )
 
         response_data = response.json()
         # Only bearer token for now
@@ -838,7 +888,12 @@ class Client:
 
         url = f"{self.base_url}/v1/models"
 
-        response = requests.get(url, headers=self._headers)
+        headers = self._headers
+        if self._models_cache is not None:
+            headers = {**headers, "If-None-Match": self._models_cache[0]}
+        response = self.session.get(url, headers=headers)
+        if response.status_code == 304 and self._models_cache is not None:
+            return dict(self._models_cache[1])
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to list model, detail: {_get_error_string(response)}"
@@ -846,7 +901,10 @@ class Client:
 
         response_data = response.json()
         model_list = response_data["data"]
-        return {item["id"]: item for item in model_list}
+        models = {item["id"]: item for item in model_list}
+        etag = response.headers.get("ETag")
+        self._models_cache = (etag, models) if etag else None
+        return dict(models)
 
     def launch_model(
         self,
@@ -935,7 +993,7 @@ class Client:
         for key, value in kwargs.items():
             payload[str(key)] = value
 
-        response = requests.post(url, json=payload, headers=self._headers)
+        response = self.session.post(url, json=payload, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to launch model, detail: {_get_error_string(response)}"
@@ -962,7 +1020,7 @@ class Client:
 
         url = f"{self.base_url}/v1/models/{model_uid}"
 
-        response = requests.delete(url, headers=self._headers)
+        response = self.session.delete(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to terminate model, detail: {_get_error_string(response)}"
@@ -970,7 +1028,7 @@ class Client:
 
     def _get_supervisor_internal_address(self):
         url = f"{self.base_url}/v1/address"
-        response = requests.get(url, headers=self._headers)
+        response = self.session.get(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(f"Failed to get supervisor internal address")
         response_data = response.json()
@@ -1001,7 +1059,7 @@ class Client:
         """
 
         url = f"{self.base_url}/v1/models/{model_uid}"
-        response = requests.get(url, headers=self._headers)
+        response = self.session.get(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to get the model description, detail: {_get_error_string(response)}"
@@ -1011,37 +1069,61 @@ class Client:
         if desc["model_type"] == "LLM":
             if "chat" in desc["model_ability"]:
                 return RESTfulChatModelHandle(
-                    model_uid, self.base_url, auth_headers=self._headers
+                    model_uid,
+                    self.base_url,
+                    auth_headers=self._headers,
+                    session=self.session,
                 )
             elif "generate" in desc["model_ability"]:
                 return RESTfulGenerateModelHandle(
-                    model_uid, self.base_url, auth_headers=self._headers
+                    model_uid,
+                    self.base_url,
+                    auth_headers=self._headers,
+                    session=self.session,
                 )
             else:
                 raise ValueError(f"Unrecognized model ability: {desc['model_ability']}")
         elif desc["model_type"] == "embedding":
             return RESTfulEmbeddingModelHandle(
-                model_uid, self.base_url, auth_headers=self._headers
+                model_uid,
+                self.base_url,
+                auth_headers=self._headers,
+                session=self.session,
             )
         elif desc["model_type"] == "image":
             return RESTfulImageModelHandle(
-                model_uid, self.base_url, auth_headers=self._headers
+                model_uid,
+                self.base_url,
+                auth_headers=self._headers,
+                session=self.session,
             )
         elif desc["model_type"] == "rerank":
             return RESTfulRerankModelHandle(
-                model_uid, self.base_url, auth_headers=self._headers
+                model_uid,
+                self.base_url,
+                auth_headers=self._headers,
+                session=self.session,
             )
         elif desc["model_type"] == "audio":
             return RESTfulAudioModelHandle(
-                model_uid, self.base_url, auth_headers=self._headers
+                model_uid,
+                self.base_url,
+                auth_headers=self._headers,
+                session=self.session,
             )
         elif desc["model_type"] == "video":
             return RESTfulVideoModelHandle(
-                model_uid, self.base_url, auth_headers=self._headers
+                model_uid,
+                self.base_url,
+                auth_headers=self._headers,
+                session=self.session,
             )
         elif desc["model_type"] == "flexible":
             return RESTfulFlexibleModelHandle(
-                model_uid, self.base_url, auth_headers=self._headers
+                model_uid,
+                self.base_url,
+                auth_headers=self._headers,
+                session=self.session,
             )
         else:
             raise ValueError(f"Unknown model type:{desc['model_type']}")
@@ -1089,7 +1171,7 @@ class Client:
         """
 
         url = f"{self.base_url}/v1/models/{model_uid}"
-        response = requests.get(url, headers=self._headers)
+        response = self.session.get(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to get the model description, detail: {_get_error_string(response)}"
@@ -1124,7 +1206,7 @@ class Client:
         """
         url = f"{self.base_url}/v1/model_registrations/{model_type}"
         request_body = {"model": model, "worker_ip": worker_ip, "persist": persist}
-        response = requests.post(url, json=request_body, headers=self._headers)
+        response = self.session.post(url, json=request_body, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to register model, detail: {_get_error_string(response)}"
@@ -1150,7 +1232,7 @@ class Client:
             Report failure to unregister the custom model. Provide details of failure through error message.
         """
         url = f"{self.base_url}/v1/model_registrations/{model_type}/{model_name}"
-        response = requests.delete(url, headers=self._headers)
+        response = self.session.delete(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to register model, detail: {_get_error_string(response)}"
@@ -1180,7 +1262,7 @@ class Client:
 
         """
         url = f"{self.base_url}/v1/model_registrations/{model_type}"
-        response = requests.get(url, headers=self._headers)
+        response = self.session.get(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to list model registration, detail: {_get_error_string(response)}"
@@ -1217,7 +1299,7 @@ class Client:
             "model_name": model_name,
             "worker_ip": worker_ip,
         }
-        response = requests.get(url, headers=self._headers, params=params)
+        response = self.session.get(url, headers=self._headers, params=params)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to list cached model, detail: {_get_error_string(response)}"
@@ -1248,7 +1330,7 @@ class Client:
             "model_version": model_version,
             "worker_ip": worker_ip,
         }
-        response = requests.get(url, headers=self._headers, params=params)
+        response = self.session.get(url, headers=self._headers, params=params)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to get paths by model name, detail: {_get_error_string(response)}"
@@ -1278,7 +1360,7 @@ class Client:
             "model_version": model_version,
             "worker_ip": worker_ip,
         }
-        response = requests.delete(url, headers=self._headers, params=params)
+        response = self.session.delete(url, headers=self._headers, params=params)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to remove cached models, detail: {_get_error_string(response)}"
@@ -1306,7 +1388,7 @@ class Client:
             The collection of registered models on the server.
         """
         url = f"{self.base_url}/v1/model_registrations/{model_type}/{model_name}"
-        response = requests.get(url, headers=self._headers)
+        response = self.session.get(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to list model registration, detail: {_get_error_string(response)}"
@@ -1329,7 +1411,7 @@ class Client:
             The supported engine parameters of registered models on the server.
         """
         url = f"{self.base_url}/v1/engines/{model_name}"
-        response = requests.get(url, headers=self._headers)
+        response = self.session.get(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to query engine parameters by model name, detail: {_get_error_string(response)}"
@@ -1356,7 +1438,7 @@ class Client:
             Return empty dict.
         """
         url = f"{self.base_url}/v1/models/{model_uid}/requests/{request_id}/abort"
-        response = requests.post(url, headers=self._headers)
+        response = self.session.post(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to abort request, detail: {_get_error_string(response)}"
@@ -1367,7 +1449,7 @@ class Client:
 
     def get_workers_info(self):
         url = f"{self.base_url}/v1/workers"
-        response = requests.get(url, headers=self._headers)
+        response = self.session.get(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to get workers info, detail: {_get_error_string(response)}"
@@ -1377,7 +1459,7 @@ class Client:
 
     def get_supervisor_info(self):
         url = f"{self.base_url}/v1/supervisor"
-        response = requests.get(url, headers=self._headers)
+        response = self.session.get(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to get supervisor info, detail: {_get_error_string(response)}"
@@ -1387,7 +1469,7 @@ class Client:
 
     def get_progress(self, request_id: str):
         url = f"{self.base_url}/v1/requests/{request_id}/progress"
-        response = requests.get(url, headers=self._headers)
+        response = self.session.get(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to get progress, detail: {_get_error_string(response)}"
@@ -1397,7 +1479,7 @@ class Client:
 
     def abort_cluster(self):
         url = f"{self.base_url}/v1/clusters"
-        response = requests.delete(url, headers=self._headers)
+        response = self.session.delete(url, headers=self._headers)
         if response.status_code != 200:
             raise RuntimeError(
                 f"Failed to abort cluster, detail: {_get_error_string(response)}"
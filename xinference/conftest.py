@@ -114,23 +114,25 @@ def api_health_check(endpoint: str, max_attempts: int, sleep_interval: int = 3):
 
     import requests
 
-    attempts = 0
-    while attempts < max_attempts:
-        time.sleep(sleep_interval)
-        try:
-            response = requests.get(f"{endpoint}/status")
-            if response.status_code == 200:
-                return True
-        except requests.RequestException as e:
-            print(f"Error while checking endpoint: {e}")
-
-        attempts += 1
-        if attempts < max_attempts:
-            print(
-                f"Endpoint not available, will try {max_attempts - attempts} more times"
-            )
-
-    return False
+    # probe right away and back off exponentially, but keep the overall budget of
+    # max_attempts * sleep_interval seconds so slow startups still succeed.
+    deadline = time.monotonic() + max_attempts * sleep_interval
+    delay = 0.05
+    with requests.Session() as session:
+        while True:
+            try:
+                response = session.get(f"{endpoint}/status")
+                if response.status_code == 200:
+                    return True
+            except requests.RequestException as e:
+                print(f"Error while checking endpoint: {e}")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            print(f"Endpoint not available, will retry in {delay:.2f}s")
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, sleep_interval)
 
 
 async def _start_test_cluster(
@@ -165,7 +167,8 @@ def run_test_cluster(address: str, logging_conf: Optional[Dict] = None):
 
     signal.signal(signal.SIGTERM, sigterm_handler)
 
-    loop = asyncio.get_event_loop()
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
     task = loop.create_task(
         _start_test_cluster(address=address, logging_conf=logging_conf)
     )
@@ -175,10 +178,9 @@ def run_test_cluster(address: str, logging_conf: Optional[Dict] = None):
 def run_test_cluster_in_subprocess(
     address: str, logging_conf: Optional[Dict] = None
 ) -> multiprocessing.Process:
-    # prevent re-init cuda error.
-    multiprocessing.set_start_method(method="spawn", force=True)
-
-    p = multiprocessing.Process(target=run_test_cluster, args=(address, logging_conf))
+    # prevent re-init cuda error, without changing the global start method.
+    ctx = multiprocessing.get_context("spawn")
+    p = ctx.Process(target=run_test_cluster, args=(address, logging_conf))
     p.start()
     return p
 
@@ -29,6 +29,7 @@ XINFERENCE_ENV_DISABLE_HEALTH_CHECK = "XINFERENCE_DISABLE_HEALTH_CHECK"
 XINFERENCE_ENV_DISABLE_METRICS = "XINFERENCE_DISABLE_METRICS"
 XINFERENCE_ENV_DOWNLOAD_MAX_ATTEMPTS = "XINFERENCE_DOWNLOAD_MAX_ATTEMPTS"
 XINFERENCE_ENV_TEXT_TO_IMAGE_BATCHING_SIZE = "XINFERENCE_TEXT_TO_IMAGE_BATCHING_SIZE"
+XINFERENCE_ENV_WORKER_MAX_MODELS = "XINFERENCE_WORKER_MAX_MODELS"
 
 
 def get_xinference_home() -> str:
@@ -86,3 +87,8 @@ XINFERENCE_DOWNLOAD_MAX_ATTEMPTS = int(
 XINFERENCE_TEXT_TO_IMAGE_BATCHING_SIZE = os.environ.get(
     XINFERENCE_ENV_TEXT_TO_IMAGE_BATCHING_SIZE, None
 )
+XINFERENCE_WORKER_MAX_MODELS = (
+    int(os.environ[XINFERENCE_ENV_WORKER_MAX_MODELS])
+    if os.environ.get(XINFERENCE_ENV_WORKER_MAX_MODELS)
+    else None
+)
@@ -12,7 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from logging import getLogger
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Tuple
 
 import xoscar as xo
 
@@ -23,6 +23,8 @@ class CacheTrackerActor(xo.Actor):
     def __init__(self):
         super().__init__()
         self._model_name_to_version_info: Dict[str, List[Dict]] = {}  # type: ignore
+        # (model_name, model_version) -> the same version info dict stored above
+        self._version_index: Dict[Tuple[str, Optional[str]], Dict] = {}
 
     @classmethod
     def default_uid(cls) -> str:
@@ -53,6 +55,9 @@ class CacheTrackerActor(xo.Actor):
         for model_name, model_versions in version_info.items():
             if model_name not in self._model_name_to_version_info:
                 self._model_name_to_version_info[model_name] = model_versions
+                for version in model_versions:
+                    key = (model_name, version.get("model_version"))
+                    self._version_index[key] = version
             else:
                 assert len(model_versions) == len(
                     self._model_name_to_version_info[model_name]
@@ -79,17 +84,20 @@ class CacheTrackerActor(xo.Actor):
         if model_name not in self._model_name_to_version_info:
             logger.warning(f"Not record version info for {model_name} for now.")
         else:
-            for version_info in self._model_name_to_version_info[model_name]:
-                if model_version is None:  # image model
+            if model_version is None:  # image model
+                for version_info in self._model_name_to_version_info[model_name]:
+                    self._update_file_location({address: model_path}, version_info)
+                    version_info["cache_status"] = True
+            else:
+                version_info = self._version_index.get((model_name, model_version))
+                if version_info is not None:
                     self._update_file_location({address: model_path}, version_info)
                     version_info["cache_status"] = True
-                else:
-                    if version_info["model_version"] == model_version:
-                        self._update_file_location({address: model_path}, version_info)
-                        version_info["cache_status"] = True
 
     def unregister_model_version(self, model_name: str):
-        self._model_name_to_version_info.pop(model_name, None)
+        for version_info in self._model_name_to_version_info.pop(model_name, []):
+            key = (model_name, version_info.get("model_version"))
+            self._version_index.pop(key, None)
 
     def get_model_versions(self, model_name: str) -> List[Dict]:
         if model_name not in self._model_name_to_version_info:
@@ -104,23 +112,25 @@ class CacheTrackerActor(xo.Actor):
     def list_cached_models(
         self, worker_ip: str, model_name: Optional[str] = None
     ) -> List[Dict[Any, Any]]:
+        # only return assigned cached model if model_name is not none
+        # else return all cached model
+        if model_name:
+            items = [(model_name, self._model_name_to_version_info.get(model_name, []))]
+        else:
+            items = self._model_name_to_version_info.items()  # type: ignore
         cached_models = []
-        for name, versions in self._model_name_to_version_info.items():
-            # only return assigned cached model if model_name is not none
-            # else return all cached model
-            if model_name and model_name != name:
-                continue
+        for name, versions in items:
             for version_info in versions:
-                cache_status = version_info.get("cache_status", False)
                 # search cached model
-                if cache_status:
+                if not version_info.get("cache_status", False):
+                    continue
+                paths = version_info.get("model_file_location") or {}
+                # only return assigned worker's device path
+                if worker_ip in paths:
                     res = version_info.copy()
                     res["model_name"] = name
-                    paths = res.get("model_file_location", {})
-                    # only return assigned worker's device path
-                    if worker_ip in paths.keys():
-                        res["model_file_location"] = paths[worker_ip]
-                        cached_models.append(res)
+                    res["model_file_location"] = paths[worker_ip]
+                    cached_models.append(res)
         return cached_models
 
     def list_deletable_models(self, model_version: str, worker_ip: str) -> str:
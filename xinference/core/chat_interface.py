@@ -15,6 +15,9 @@
 import base64
 import logging
 import os
+import threading
+import time
+from collections import deque
 from io import BytesIO
 from typing import Dict, Generator, List, Optional
 
@@ -23,6 +26,7 @@ import PIL.Image
 from gradio.components import Markdown, Textbox
 from gradio.layouts import Accordion, Column, Row
 
+from ..client.restful.restful_client import Client as RESTfulClient
 from ..client.restful.restful_client import (
     RESTfulChatModelHandle,
     RESTfulGenerateModelHandle,
@@ -30,8 +34,57 @@ from ..client.restful.restful_client import (
 
 logger = logging.getLogger(__name__)
 
+_FAVICON_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "web",
+    "ui",
+    "public",
+    "favicon.svg",
+)
+
+# Number of streams one interface serves at once. Gradio defaults to a single one per
+# event, but the model server does its own scheduling and batching. Stay below the
+# 40 worker threads Gradio runs sync handlers on, so non-queued events still get one.
+_GRADIO_CONCURRENCY_LIMIT = 32
+
+# number of undo steps kept by the generate interface
+_MAX_GENERATE_HISTORY = 64
+
+# minimum seconds between two UI updates while streaming
+_STREAM_UPDATE_INTERVAL = 0.025
+
+
+class _StreamThrottle:
+    """
+    Every yielded update is a Gradio event plus a re-render of the component, so
+    coalesce the streamed tokens into at most one update per interval.
+    """
+
+    def __init__(self, interval: float = _STREAM_UPDATE_INTERVAL):
+        self._interval = interval
+        # the first chunk is always shown right away
+        self._last = float("-inf")
+
+    def ready(self) -> bool:
+        now = time.monotonic()
+        if now - self._last < self._interval:
+            return False
+        self._last = now
+        return True
+
 
 class GradioInterface:
+    _CSS = """
+    .center{
+        display: flex;
+        justify-content: center;
+        align-items: center;
+        padding: 0px;
+        color: #9ea4b0 !important;
+    }
+    """
+
     def __init__(
         self,
         endpoint: str,
@@ -61,6 +114,39 @@ class GradioInterface:
         self._access_token = (
             access_token.replace("Bearer ", "") if access_token is not None else None
         )
+        self._model = None
+        self._model_lock = threading.Lock()
+        # static model info shown at the top of every interface
+        self._model_info_html = f"""
+            <div class="center">
+            Model ID: {model_uid}
+            </div>
+            <div class="center">
+            Model Size: {model_size_in_billions} Billion Parameters
+            </div>
+            <div class="center">
+            Model Format: {model_format}
+            </div>
+            <div class="center">
+            Model Quantization: {quantization}
+            </div>
+            """
+
+    def _get_model(self):
+        # Share one client and model handle across requests, so that they reuse its
+        # pooled connections and skip describing the model on every submission.
+        with self._model_lock:
+            if self._model is None:
+                client = RESTfulClient(self.endpoint)
+                client._set_token(self._access_token)
+                model = client.get_model(self.model_uid)
+                if "chat" in self.model_ability or "vision" in self.model_ability:
+                    if not isinstance(model, RESTfulChatModelHandle):
+                        raise ValueError(f"model {self.model_uid} has no chat method")
+                elif not isinstance(model, RESTfulGenerateModelHandle):
+                    raise ValueError(f"model {self.model_uid} has no generate method")
+                self._model = model
+            return self._model
 
     def build(self) -> "gr.Blocks":
         if "vision" in self.model_ability:
@@ -70,37 +156,23 @@ class GradioInterface:
         else:
             interface = self.build_generate_interface()
 
-        interface.queue()
+        interface.queue(default_concurrency_limit=_GRADIO_CONCURRENCY_LIMIT)
         # Gradio initiates the queue during a startup event, but since the app has already been
         # started, that event will not run, so manually invoke the startup events.
         # See: https://github.com/gradio-app/gradio/issues/5228
         interface.startup_events()
-        favicon_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            os.path.pardir,
-            "web",
-            "ui",
-            "public",
-            "favicon.svg",
-        )
-        interface.favicon_path = favicon_path
+        interface.favicon_path = _FAVICON_PATH
         return interface
 
     def build_chat_interface(
         self,
     ) -> "gr.Blocks":
-        def flatten(matrix: List[List[str]]) -> List[str]:
-            flat_list = []
-            for row in matrix:
-                flat_list += row
-            return flat_list
-
-        def to_chat(lst: List[str]) -> List[Dict]:
-            res = []
-            for i in range(len(lst)):
-                role = "assistant" if i % 2 == 1 else "user"
-                res.append(dict(role=role, content=lst[i]))
-            return res
+        def to_chat(history: List[List[str]]) -> List[Dict]:
+            return [
+                dict(role=role, content=content)
+                for row in history
+                for role, content in zip(("user", "assistant"), row)
+            ]
 
         def generate_wrapper(
             message: str,
@@ -109,16 +181,14 @@ class GradioInterface:
             temperature: float,
             lora_name: str,
         ) -> Generator:
-            from ..client import RESTfulClient
-
-            client = RESTfulClient(self.endpoint)
-            client._set_token(self._access_token)
-            model = client.get_model(self.model_uid)
-            assert isinstance(model, RESTfulChatModelHandle)
-            messages = to_chat(flatten(history))
+            model = self._get_model()
+            messages = to_chat(history)
             messages.append(dict(role="user", content=message))
 
-            response_content = ""
+            # join the pieces only when an update is due, not on every token
+            parts: List[str] = []
+            append = parts.append
+            throttle = _StreamThrottle()
             for chunk in model.chat(
                 messages,
                 generate_config={
@@ -128,15 +198,14 @@ class GradioInterface:
                     "lora_name": lora_name,
                 },
             ):
-                assert isinstance(chunk, dict)
-                delta = chunk["choices"][0]["delta"]
-                if "content" not in delta:
+                content = chunk["choices"][0]["delta"].get("content")
+                if content is None:
                     continue
-                else:
-                    response_content += delta["content"]
-                    yield response_content
+                append(content)
+                if throttle.ready():
+                    yield "".join(parts)
 
-            yield response_content
+            yield "".join(parts)
 
         return gr.ChatInterface(
             fn=generate_wrapper,
@@ -154,29 +223,8 @@ class GradioInterface:
                 gr.Text(label="LoRA Name"),
             ],
             title=f"🚀 Xinference Chat Bot : {self.model_name} 🚀",
-            css="""
-            .center{
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                padding: 0px;
-                color: #9ea4b0 !important;
-            }
-            """,
-            description=f"""
-            <div class="center">
-            Model ID: {self.model_uid}
-            </div>
-            <div class="center">
-            Model Size: {self.model_size_in_billions} Billion Parameters
-            </div>
-            <div class="center">
-            Model Format: {self.model_format}
-            </div>
-            <div class="center">
-            Model Quantization: {self.quantization}
-            </div>
-            """,
+            css=self._CSS,
+            description=self._model_info_html,
             analytics_enabled=False,
         )
 
@@ -184,15 +232,12 @@ class GradioInterface:
         self,
     ) -> "gr.Blocks":
         def predict(history, bot, max_tokens, temperature, stream):
-            from ..client import RESTfulClient
-
-            client = RESTfulClient(self.endpoint)
-            client._set_token(self._access_token)
-            model = client.get_model(self.model_uid)
-            assert isinstance(model, RESTfulChatModelHandle)
+            model = self._get_model()
 
             if stream:
-                response_content = ""
+                parts: List[str] = []
+                append = parts.append
+                throttle = _StreamThrottle()
                 for chunk in model.chat(
                     messages=history,
                     generate_config={
@@ -201,14 +246,14 @@ class GradioInterface:
                         "stream": stream,
                     },
                 ):
-                    assert isinstance(chunk, dict)
-                    delta = chunk["choices"][0]["delta"]
-                    if "content" not in delta:
+                    content = chunk["choices"][0]["delta"].get("content")
+                    if content is None:
                         continue
-                    else:
-                        response_content += delta["content"]
-                        bot[-1][1] = response_content
+                    append(content)
+                    if throttle.ready():
+                        bot[-1][1] = "".join(parts)
                         yield history, bot
+                response_content = "".join(parts)
                 history.append(
                     {
                         "content": response_content,
@@ -235,19 +280,24 @@ class GradioInterface:
             if image:
                 buffered = BytesIO()
                 with PIL.Image.open(image) as img:
+                    # thumbnail() lets the decoder downscale JPEGs while reading
                     img.thumbnail((500, 500))
+                    if img.mode != "RGB":
+                        img = img.convert("RGB")
                     img.save(buffered, format="JPEG")
-                img_b64_str = base64.b64encode(buffered.getvalue()).decode()
-                display_content = f'<img src="data:image/png;base64,{img_b64_str}" alt="user upload image" />\n{text}'
+                img_b64_str = base64.b64encode(buffered.getbuffer()).decode()
+                # encode the data url once, the display html and the message share it
+                image_url = f"data:image/jpeg;base64,{img_b64_str}"
+                display_content = (
+                    f'<img src="{image_url}" alt="user upload image" />\n{text}'
+                )
                 message = {
                     "role": "user",
                     "content": [
                         {"type": "text", "text": text},
                         {
                             "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/png;base64,{img_b64_str}"
-                            },
+                            "image_url": {"url": image_url},
                         },
                     ],
                 }
@@ -285,28 +335,19 @@ class GradioInterface:
             else:
                 display_content = text
                 message = {"role": "user", "content": text}
-            history = history + [message]
-            bot = bot + [[display_content, None]]
+            # the session state is owned by this handler chain, predict appends to it
+            # in place as well, so avoid copying the whole history every turn
+            history.append(message)
+            bot.append([display_content, None])
             return history, bot, "", None, None
 
         def clear_history():
             logger.debug("Clear history.")
             return [], None, "", None, None
 
-        def update_button(text):
-            return gr.update(interactive=bool(text))
-
         with gr.Blocks(
             title=f"🚀 Xinference Chat Bot : {self.model_name} 🚀",
-            css="""
-        .center{
-            display: flex;
-            justify-content: center;
-            align-items: center;
-            padding: 0px;
-            color: #9ea4b0 !important;
-        }
-        """,
+            css=self._CSS,
             analytics_enabled=False,
         ) as chat_vl_interface:
             Markdown(
@@ -314,22 +355,7 @@ class GradioInterface:
                 <h1 style='text-align: center; margin-bottom: 1rem'>🚀 Xinference Chat Bot : {self.model_name} 🚀</h1>
                 """
             )
-            Markdown(
-                f"""
-                <div class="center">
-                Model ID: {self.model_uid}
-                </div>
-                <div class="center">
-                Model Size: {self.model_size_in_billions} Billion Parameters
-                </div>
-                <div class="center">
-                Model Format: {self.model_format}
-                </div>
-                <div class="center">
-                Model Quantization: {self.quantization}
-                </div>
-                """
-            )
+            Markdown(self._model_info_html)
 
             state = gr.State([])
             with gr.Row():
@@ -360,9 +386,16 @@ class GradioInterface:
                 temperature = gr.Slider(
                     minimum=0, maximum=2, value=1, step=0.01, label="Temperature"
                 )
-                stream = gr.Checkbox(label="Stream", value=False)
+                stream = gr.Checkbox(label="Stream", value=True)
 
-            textbox.change(update_button, [textbox], [submit_btn], queue=False)
+            # toggle the button in the browser, this fires on every keystroke
+            textbox.change(
+                None,
+                [textbox],
+                [submit_btn],
+                js="(text) => ({__type__: 'update', interactive: !!text})",
+                queue=False,
+            )
 
             textbox.submit(
                 add_text,
@@ -400,12 +433,13 @@ class GradioInterface:
     ):
         def undo(text, hist):
             if len(hist) == 0:
+                hist.append(text)
                 return {
                     textbox: "",
-                    history: [text],
+                    history: hist,
                 }
             if text == hist[-1]:
-                hist = hist[:-1]
+                hist.pop()
 
             return {
                 textbox: hist[-1] if len(hist) > 0 else "",
@@ -413,7 +447,7 @@ class GradioInterface:
             }
 
         def clear(text, hist):
-            if len(hist) == 0 or (len(hist) > 0 and text != hist[-1]):
+            if not hist or text != hist[-1]:
                 hist.append(text)
             hist.append("")
             return {
@@ -422,17 +456,14 @@ class GradioInterface:
             }
 
         def complete(text, hist, max_tokens, temperature, lora_name) -> Generator:
-            from ..client import RESTfulClient
-
-            client = RESTfulClient(self.endpoint)
-            client._set_token(self._access_token)
-            model = client.get_model(self.model_uid)
-            assert isinstance(model, RESTfulGenerateModelHandle)
+            model = self._get_model()
 
-            if len(hist) == 0 or (len(hist) > 0 and text != hist[-1]):
+            if not hist or text != hist[-1]:
                 hist.append(text)
 
-            response_content = text
+            parts = [text]
+            append = parts.append
+            throttle = _StreamThrottle()
             for chunk in model.generate(
                 prompt=text,
                 generate_config={
@@ -442,36 +473,33 @@ class GradioInterface:
                     "lora_name": lora_name,
                 },
             ):
-                assert isinstance(chunk, dict)
-                choice = chunk["choices"][0]
-                if "text" not in choice:
+                piece = chunk["choices"][0].get("text")
+                if piece is None:
                     continue
-                else:
-                    response_content += choice["text"]
+                append(piece)
+                if throttle.ready():
                     yield {
-                        textbox: response_content,
+                        textbox: "".join(parts),
                         history: hist,
                     }
 
+            response_content = "".join(parts)
             hist.append(response_content)
-            return {  # type: ignore
+            yield {
                 textbox: response_content,
                 history: hist,
             }
 
         def retry(text, hist, max_tokens, temperature, lora_name) -> Generator:
-            from ..client import RESTfulClient
-
-            client = RESTfulClient(self.endpoint)
-            client._set_token(self._access_token)
-            model = client.get_model(self.model_uid)
-            assert isinstance(model, RESTfulGenerateModelHandle)
+            model = self._get_model()
 
-            if len(hist) == 0 or (len(hist) > 0 and text != hist[-1]):
+            if not hist or text != hist[-1]:
                 hist.append(text)
             text = hist[-2] if len(hist) > 1 else ""
 
-            response_content = text
+            parts = [text]
+            append = parts.append
+            throttle = _StreamThrottle()
             for chunk in model.generate(
                 prompt=text,
                 generate_config={
@@ -481,59 +509,36 @@ class GradioInterface:
                     "lora_name": lora_name,
                 },
             ):
-                assert isinstance(chunk, dict)
-                choice = chunk["choices"][0]
-                if "text" not in choice:
+                piece = chunk["choices"][0].get("text")
+                if piece is None:
                     continue
-                else:
-                    response_content += choice["text"]
+                append(piece)
+                if throttle.ready():
                     yield {
-                        textbox: response_content,
+                        textbox: "".join(parts),
                         history: hist,
                     }
 
+            response_content = "".join(parts)
             hist.append(response_content)
-            return {  # type: ignore
+            yield {
                 textbox: response_content,
                 history: hist,
             }
 
         with gr.Blocks(
             title=f"🚀 Xinference Generate Bot : {self.model_name} 🚀",
-            css="""
-            .center{
-                display: flex;
-                justify-content: center;
-                align-items: center;
-                padding: 0px;
-                color: #9ea4b0 !important;
-            }
-            """,
+            css=self._CSS,
             analytics_enabled=False,
         ) as generate_interface:
-            history = gr.State([])
+            history = gr.State(deque(maxlen=_MAX_GENERATE_HISTORY))
 
             Markdown(
                 f"""
                 <h1 style='text-align: center; margin-bottom: 1rem'>🚀 Xinference Generate Bot : {self.model_name} 🚀</h1>
                 """
             )
-            Markdown(
-                f"""
-                <div class="center">
-                Model ID: {self.model_uid}
-                </div>
-                <div class="center">
-                Model Size: {self.model_size_in_billions} Billion Parameters
-                </div>
-                <div class="center">
-                Model Format: {self.model_format}
-                </div>
-                <div class="center">
-                Model Quantization: {self.quantization}
-                </div>
-                """
-            )
+            Markdown(self._model_info_html)
 
             with Column(variant="panel"):
                 textbox = Textbox(
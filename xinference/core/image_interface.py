@@ -13,22 +13,42 @@
 # limitations under the License.
 
 import base64
+import hashlib
 import io
 import logging
 import os
 import threading
 import time
 import uuid
-from typing import Dict, List, Optional, Union
+from typing import Dict, List, Optional, Tuple, Union
 
 import gradio as gr
 import PIL.Image
 from gradio import Markdown
 
+from ..client.restful.restful_client import Client as RESTfulClient
 from ..client.restful.restful_client import RESTfulImageModelHandle
 
 logger = logging.getLogger(__name__)
 
+_FAVICON_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)),
+    os.pardir,
+    "web",
+    "ui",
+    "public",
+    "favicon.svg",
+)
+
+
+def _decode_images(response) -> List[PIL.Image.Image]:
+    images = []
+    for image_dict in response["data"]:
+        assert image_dict["b64_json"] is not None
+        image_data = base64.b64decode(image_dict["b64_json"])
+        images.append(PIL.Image.open(io.BytesIO(image_data)))
+    return images
+
 
 class ImageInterface:
     def __init__(
@@ -54,6 +74,47 @@ class ImageInterface:
         self.access_token = (
             access_token.replace("Bearer ", "") if access_token is not None else None
         )
+        self._client: Optional[RESTfulClient] = None
+        self._model: Optional[RESTfulImageModelHandle] = None
+        self._lock = threading.Lock()
+        # (digest of the pixels, PNG bytes) of the last uploaded image
+        self._encoded_image: Optional[Tuple[bytes, bytes]] = None
+
+    def _get_client(self) -> RESTfulClient:
+        # Share one client across requests, so that they reuse its pooled connections.
+        with self._lock:
+            if self._client is None:
+                client = RESTfulClient(self.endpoint)
+                client._set_token(self.access_token)
+                self._client = client
+            return self._client
+
+    def _get_model(self) -> RESTfulImageModelHandle:
+        # The model handle does not change, describe the model only once.
+        client = self._get_client()
+        with self._lock:
+            if self._model is None:
+                model = client.get_model(self.model_uid)
+                if not isinstance(model, RESTfulImageModelHandle):
+                    raise ValueError(f"model {self.model_uid} is not an image model")
+                self._model = model
+            return self._model
+
+    def _encode_image(self, image: PIL.Image.Image) -> bytes:
+        # Users often click Generate repeatedly on the same upload, hashing the
+        # pixels is much cheaper than compressing them into a PNG again.
+        digest = hashlib.blake2b(
+            f"{image.mode}{image.size}".encode() + image.tobytes(), digest_size=16
+        ).digest()
+        cached = self._encoded_image
+        if cached is not None and cached[0] == digest:
+            return cached[1]
+        bio = io.BytesIO()
+        # the server decodes it right away, favor speed over size
+        image.save(bio, format="png", compress_level=1)
+        data = bio.getvalue()
+        self._encoded_image = (digest, data)
+        return data
 
     def build(self) -> gr.Blocks:
         assert "stable_diffusion" in self.model_family
@@ -64,15 +125,7 @@ class ImageInterface:
         # started, that event will not run, so manually invoke the startup events.
         # See: https://github.com/gradio-app/gradio/issues/5228
         interface.startup_events()
-        favicon_path = os.path.join(
-            os.path.dirname(os.path.abspath(__file__)),
-            os.path.pardir,
-            "web",
-            "ui",
-            "public",
-            "favicon.svg",
-        )
-        interface.favicon_path = favicon_path
+        interface.favicon_path = _FAVICON_PATH
         return interface
 
     def text2image_interface(self) -> "gr.Blocks":
@@ -88,13 +141,9 @@ class ImageInterface:
             negative_prompt: Optional[str] = None,
             sampler_name: Optional[str] = None,
             progress=gr.Progress(),
-        ) -> PIL.Image.Image:
-            from ..client import RESTfulClient
-
-            client = RESTfulClient(self.endpoint)
-            client._set_token(self.access_token)
-            model = client.get_model(self.model_uid)
-            assert isinstance(model, RESTfulImageModelHandle)
+        ) -> List[PIL.Image.Image]:
+            client = self._get_client()
+            model = self._get_model()
 
             size = f"{int(size_width)}*{int(size_height)}"
             guidance_scale = None if guidance_scale == -1 else guidance_scale  # type: ignore
@@ -110,6 +159,8 @@ class ImageInterface:
             def run_in_thread():
                 nonlocal exc, response
                 try:
+                    # a single request, so that the model generates the images as
+                    # one batch instead of queueing one request per image
                     response = model.text_to_image(
                         request_id=request_id,
                         prompt=prompt,
@@ -138,14 +189,7 @@ class ImageInterface:
             if exc:
                 raise exc
 
-            images = []
-            for image_dict in response["data"]:  # type: ignore
-                assert image_dict["b64_json"] is not None
-                image_data = base64.b64decode(image_dict["b64_json"])
-                image = PIL.Image.open(io.BytesIO(image_data))
-                images.append(image)
-
-            return images
+            return _decode_images(response)
 
         with gr.Blocks() as text2image_vl_interface:
             with gr.Column():
@@ -214,12 +258,8 @@ class ImageInterface:
             sampler_name: Optional[str] = None,
             progress=gr.Progress(),
         ) -> PIL.Image.Image:
-            from ..client import RESTfulClient
-
-            client = RESTfulClient(self.endpoint)
-            client._set_token(self.access_token)
-            model = client.get_model(self.model_uid)
-            assert isinstance(model, RESTfulImageModelHandle)
+            client = self._get_client()
+            model = self._get_model()
 
             if size_width > 0 and size_height > 0:
                 size = f"{int(size_width)}*{int(size_height)}"
@@ -231,8 +271,7 @@ class ImageInterface:
             padding_image_to_multiple = None if padding_image_to_multiple == -1 else padding_image_to_multiple  # type: ignore
             sampler_name = None if sampler_name == "default" else sampler_name
 
-            bio = io.BytesIO()
-            image.save(bio, format="png")
+            image_bytes = self._encode_image(image)
 
             response = None
             exc = None
@@ -246,7 +285,7 @@ class ImageInterface:
                         prompt=prompt,
                         negative_prompt=negative_prompt,
                         n=n,
-                        image=bio.getvalue(),
+                        image=image_bytes,
                         size=size,
                         response_format="b64_json",
                         num_inference_steps=num_inference_steps,
@@ -270,14 +309,7 @@ class ImageInterface:
             if exc:
                 raise exc
 
-            images = []
-            for image_dict in response["data"]:  # type: ignore
-                assert image_dict["b64_json"] is not None
-                image_data = base64.b64decode(image_dict["b64_json"])
-                image = PIL.Image.open(io.BytesIO(image_data))
-                images.append(image)
-
-            return images
+            return _decode_images(response)
 
         with gr.Blocks() as image2image_inteface:
             with gr.Column():
@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import asyncio
+from typing import Callable, Dict, Tuple
 
 import uvicorn
 from aioprometheus import Counter, Gauge
@@ -39,9 +40,22 @@ output_tokens_total_counter = Counter(
 )
 
 
+_COLLECTORS = {
+    "generate_throughput": generate_throughput,
+    "time_to_first_token": time_to_first_token,
+    "input_tokens_total_counter": input_tokens_total_counter,
+    "output_tokens_total_counter": output_tokens_total_counter,
+}
+# (name, op) -> bound collector method, filled on first use
+_METRIC_OPS: Dict[Tuple[str, str], Callable] = {}
+
+
 def record_metrics(name, op, kwargs):
-    collector = globals().get(name)
-    getattr(collector, op)(**kwargs)
+    try:
+        fn = _METRIC_OPS[(name, op)]
+    except KeyError:
+        fn = _METRIC_OPS[(name, op)] = getattr(_COLLECTORS[name], op)
+    fn(**kwargs)
 
 
 def launch_metrics_export_server(q, host=None, port=None):
@@ -76,6 +76,9 @@ XINFERENCE_BATCHING_ALLOWED_VISION_MODELS = [
 
 XINFERENCE_TEXT_TO_IMAGE_BATCHING_ALLOWED_MODELS = ["FLUX.1-dev", "FLUX.1-schnell"]
 
+# Chunks a stream may produce ahead of its caller before generation pauses.
+_STREAM_BUFFER_SIZE = 16
+
 
 def request_limit(fn):
     """
@@ -372,7 +375,12 @@ class ModelActor(xo.StatelessActor):
         return condition
 
     async def load(self):
-        self._model.load()
+        if self.is_vllm_backend():
+            # vLLM schedules its health check task on the running event loop.
+            self._model.load()
+        else:
+            # Loading may take minutes, keep the actor pool responsive meanwhile.
+            await asyncio.to_thread(self._model.load)
         if self.allow_batching():
             await self._scheduler_ref.set_model(self._model)
             logger.debug(
@@ -474,6 +482,74 @@ class ModelActor(xo.StatelessActor):
                 )
             await asyncio.gather(*coros)
 
+    @staticmethod
+    async def _coalesce_chunks(
+        gen: Union[types.GeneratorType, types.AsyncGeneratorType]
+    ) -> AsyncGenerator[bytes, None]:
+        """
+        Merge the chunks of `gen` that are ready by the time the caller asks for the
+        next one, so that fast streams take fewer round trips to the caller.
+        The chunks are SSE events or binary data, which stay valid when concatenated.
+        Generation pauses once `_STREAM_BUFFER_SIZE` chunks are waiting, and `gen`
+        is closed when the caller stops early.
+        """
+        queue: Queue = Queue(maxsize=_STREAM_BUFFER_SIZE)
+        done = object()
+        # the `next` call of a sync generator currently running in a thread
+        pending: Optional[asyncio.Future] = None
+
+        async def _produce():
+            nonlocal pending
+            try:
+                if inspect.isasyncgen(gen):
+                    async for chunk in gen:
+                        await queue.put(chunk)
+                else:
+                    while True:
+                        pending = asyncio.ensure_future(
+                            asyncio.to_thread(next, gen, done)
+                        )
+                        # cancelling the producer must not orphan the thread
+                        chunk = await asyncio.shield(pending)
+                        pending = None
+                        if chunk is done:
+                            break
+                        await queue.put(chunk)
+            except Exception as e:
+                await queue.put(e)
+            await queue.put(done)
+
+        task = asyncio.create_task(_produce())
+        try:
+            finished = False
+            while not finished:
+                chunks = [await queue.get()]
+                while not queue.empty():
+                    chunks.append(queue.get_nowait())
+                if chunks[-1] is done:
+                    chunks.pop()
+                    finished = True
+                if chunks and isinstance(chunks[-1], Exception):
+                    if len(chunks) > 1:
+                        yield b"".join(chunks[:-1])
+                    raise chunks[-1]
+                if chunks:
+                    yield b"".join(chunks)
+        finally:
+            if not task.done():
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+            if inspect.isasyncgen(gen):
+                await gen.aclose()
+            else:
+                if pending is not None:
+                    # closing a generator while `next` runs raises ValueError
+                    await asyncio.wait([pending])
+                await asyncio.to_thread(gen.close)
+
     async def _call_wrapper_json(self, fn: Callable, *args, **kwargs):
         return await self._call_wrapper("json", fn, *args, **kwargs)
 
@@ -498,11 +574,11 @@ class ModelActor(xo.StatelessActor):
             raise Exception("Parallel generation is not supported by llama-cpp-python.")
 
         if inspect.isgenerator(ret):
-            gen = self._to_generator(output_type, ret)
+            gen = self._coalesce_chunks(self._to_generator(output_type, ret))
             self._current_generator = weakref.ref(gen)
             return gen
         if inspect.isasyncgen(ret):
-            gen = self._to_async_gen(output_type, ret)
+            gen = self._coalesce_chunks(self._to_async_gen(output_type, ret))
             self._current_generator = weakref.ref(gen)
             return gen
         if output_type == "json":
@@ -531,7 +607,7 @@ class ModelActor(xo.StatelessActor):
                 )
             if hasattr(self._model, "async_generate"):
                 if "request_id" not in kwargs:
-                    kwargs["request_id"] = str(uuid.uuid1())
+                    kwargs["request_id"] = str(uuid.uuid4())
                 else:
                     # model only accept string
                     kwargs["request_id"] = str(kwargs["request_id"])
@@ -566,6 +642,10 @@ class ModelActor(xo.StatelessActor):
                 XINFERENCE_STREAMING_ERROR_FLAG
             ):
                 raise RuntimeError(res[len(XINFERENCE_STREAMING_ERROR_FLAG) :])
+            elif isinstance(res, list):
+                # completions of one scheduler step arrive together
+                for completion in res:
+                    yield completion
             else:
                 yield res
 
@@ -591,7 +671,7 @@ class ModelActor(xo.StatelessActor):
             await self._scheduler_ref.add_request(
                 prompt_or_messages, queue, call_ability, *args, **kwargs
             )
-            gen = self._to_async_gen("json", ret)
+            gen = self._coalesce_chunks(self._to_async_gen("json", ret))
             self._current_generator = weakref.ref(gen)
             return gen
         else:
@@ -634,7 +714,7 @@ class ModelActor(xo.StatelessActor):
                     return response
                 if hasattr(self._model, "async_chat"):
                     if "request_id" not in kwargs:
-                        kwargs["request_id"] = str(uuid.uuid1())
+                        kwargs["request_id"] = str(uuid.uuid4())
                     else:
                         # model only accept string
                         kwargs["request_id"] = str(kwargs["request_id"])
@@ -14,9 +14,16 @@
 
 import asyncio
 import functools
+import hashlib
+import heapq
+import itertools
+import json
 import logging
+import threading
+import time
 import uuid
 from collections import deque
+from concurrent.futures import InvalidStateError
 from typing import Dict, List, Optional, Set, Tuple, Union
 
 import xoscar as xo
@@ -30,6 +37,17 @@ XINFERENCE_STREAMING_ERROR_FLAG = "<XINFERENCE_STREAMING_ERROR>"
 XINFERENCE_STREAMING_ABORT_FLAG = "<XINFERENCE_STREAMING_ABORT>"
 XINFERENCE_NON_STREAMING_ABORT_FLAG = "<XINFERENCE_NON_STREAMING_ABORT>"
 
+# Upper bound of prompt characters admitted into one step's prefill,
+# a burst of long prompts is otherwise prefilled (and padded) all at once.
+_MAX_PREFILL_CHARS_PER_STEP = 32768
+# Prefill batches are padded to the longest prompt, so prompts whose sizes
+# differ by more than this factor are not admitted in the same step.
+_MAX_PREFILL_SIZE_RATIO = 4
+# Waiting requests are ordered by arrival time plus this many seconds per
+# requested new token: shorter jobs go first, but a long one is only pushed
+# back by a bounded amount and cannot be starved by steady short traffic.
+_WAITING_SECONDS_PER_MAX_TOKEN = 0.01
+
 
 class InferenceRequest:
     def __init__(
@@ -93,6 +111,9 @@ class InferenceRequest:
         self.error_msg: Optional[str] = None  # type: ignore
         # For compatibility. Record some extra parameters for some special cases.
         self.extra_kwargs = {}
+        # Set when identical non-streaming requests submitted meanwhile
+        # wait for the result of this one.
+        self.coalesce_key: Optional[str] = None
 
         # check the integrity of args passed upstream
         self._check_args()
@@ -269,6 +290,23 @@ class InferenceRequest:
         )
 
 
+def _estimate_prompt_size(prompt_or_messages: Union[str, List[Dict]]) -> int:
+    # Token counts are only known after the model applies its chat template,
+    # the length of the text is a cheap stand-in at admission time.
+    if isinstance(prompt_or_messages, str):
+        return len(prompt_or_messages)
+    size = 0
+    for message in prompt_or_messages:
+        content = message.get("content")
+        if isinstance(content, str):
+            size += len(content)
+        elif isinstance(content, list):
+            for part in content:
+                if isinstance(part, dict) and isinstance(part.get("text"), str):
+                    size += len(part["text"])
+    return size
+
+
 def _get_valid_batch_kv_cache(data, skipped_indexes: Set[int]):
     from transformers.cache_utils import DynamicCache
 
@@ -288,12 +326,22 @@ class SchedulerActor(xo.StatelessActor):
 
     def __init__(self):
         super().__init__()
-        self._waiting_queue: deque[InferenceRequest] = deque()  # type: ignore
+        # heap of (rank, arrival order, request), see `_get_waiting_rank`,
+        # guarded by a lock, `add_request` and `step` run on different threads
+        self._waiting_queue: List[Tuple[float, int, InferenceRequest]] = []
+        self._waiting_lock = threading.Lock()
+        self._arrival_seq = itertools.count()
         self._running_queue: deque[InferenceRequest] = deque()  # type: ignore
         self._model = None
         self._id_to_req = {}
         self._abort_req_ids: Set[str] = set()  # type: ignore
         self._isolation = None
+        # coalesce key -> futures of duplicate requests waiting for the first one,
+        # and guarded by a lock, `step` runs on the isolation thread
+        self._inflight: Dict[str, List] = {}
+        self._inflight_lock = threading.Lock()
+        # set when a request arrives, lives on the isolation loop that runs `run`
+        self._has_work: Optional[asyncio.Event] = None
 
     async def __post_create__(self):
         from ..isolation import Isolation
@@ -330,7 +378,6 @@ class SchedulerActor(xo.StatelessActor):
         if self._model is None:
             return None
         max_num_seqs = self.get_max_num_seqs()
-        # currently, FCFS strategy
         running_list: List[InferenceRequest] = []
         while len(self._running_queue) > 0:
             if len(running_list) == max_num_seqs:
@@ -340,15 +387,32 @@ class SchedulerActor(xo.StatelessActor):
             running_list.append(req)
 
         waiting_list: List[InferenceRequest] = []
-        if len(running_list) < max_num_seqs:
-            while len(self._waiting_queue) > 0:
-                req = self._waiting_queue.popleft()
+        prefill_budget = _MAX_PREFILL_CHARS_PER_STEP
+        min_size = max_size = 0
+        with self._waiting_lock:
+            while (
+                len(self._waiting_queue) > 0
+                and len(running_list) + len(waiting_list) < max_num_seqs
+            ):
+                req = self._waiting_queue[0][-1]
+                size = _estimate_prompt_size(req.prompt)
+                # always admit at least one, so a single long prompt cannot starve
+                if waiting_list:
+                    if size > prefill_budget:
+                        break
+                    lo, hi = min(min_size, size), max(max_size, size)
+                    if hi > _MAX_PREFILL_SIZE_RATIO * max(lo, 1):
+                        break
+                    min_size, max_size = lo, hi
+                else:
+                    min_size = max_size = size
+                heapq.heappop(self._waiting_queue)
                 self._check_request_aborted(req)
                 waiting_list.append(req)
-                if len(running_list) + len(waiting_list) == max_num_seqs:
-                    break
+                prefill_budget -= size
         # must waiting_list in front
-        return waiting_list + running_list
+        waiting_list.extend(running_list)
+        return waiting_list
 
     @staticmethod
     def _empty_cache():
@@ -365,8 +429,9 @@ class SchedulerActor(xo.StatelessActor):
         stopped_batch_indexes = set()
         for idx, r in enumerate(req_list):
             if r.stream:
-                for completion in r.completion:
-                    await r.future_or_queue.put(completion)
+                # one put per request per step, the consumer unpacks the list
+                if r.completion:
+                    await r.future_or_queue.put(r.completion)
                 r.completion = []
 
             if not r.stopped:
@@ -387,20 +452,18 @@ class SchedulerActor(xo.StatelessActor):
                     if r.stream:
                         await r.future_or_queue.put(XINFERENCE_STREAMING_ABORT_FLAG)
                     else:
-                        r.future_or_queue.set_result(
-                            XINFERENCE_NON_STREAMING_ABORT_FLAG
-                        )
+                        self._set_future_result(r, XINFERENCE_NON_STREAMING_ABORT_FLAG)
                 else:
                     if r.error_msg is None:  # normal stop
                         if not r.stream:
-                            r.future_or_queue.set_result(r.completion[0])
+                            self._set_future_result(r, r.completion[0])
                         else:
                             await r.future_or_queue.put(XINFERENCE_STREAMING_DONE_FLAG)
                     # Abnormal stop, currently indicates that the parameter check does not pass,
                     # and does not participate in the inference
                     else:
                         if not r.stream:
-                            r.future_or_queue.set_exception(ValueError(r.error_msg))
+                            self._set_future_exception(r, ValueError(r.error_msg))
                         else:
                             await r.future_or_queue.put(
                                 XINFERENCE_STREAMING_ERROR_FLAG + r.error_msg
@@ -425,6 +488,15 @@ class SchedulerActor(xo.StatelessActor):
         *args,
         **kwargs,
     ):
+        coalesce_key = self._get_coalesce_key(
+            prompt_or_messages, call_ability, *args, **kwargs
+        )
+        if coalesce_key is not None:
+            with self._inflight_lock:
+                waiters = self._inflight.get(coalesce_key)
+                if waiters is not None:
+                    waiters.append(future_or_queue)
+                    return
         req = InferenceRequest(
             prompt_or_messages, future_or_queue, True, call_ability, *args, **kwargs
         )
@@ -433,7 +505,80 @@ class SchedulerActor(xo.StatelessActor):
             if rid in self._id_to_req:
                 raise KeyError(f"Request id: {rid} has already existed!")
             self._id_to_req[rid] = req
-        self._waiting_queue.append(req)
+        if coalesce_key is not None:
+            req.coalesce_key = coalesce_key
+            with self._inflight_lock:
+                self._inflight[coalesce_key] = []
+        rank = self._get_waiting_rank(req)
+        with self._waiting_lock:
+            heapq.heappush(self._waiting_queue, (rank, next(self._arrival_seq), req))
+        self._notify_has_work()
+
+    @staticmethod
+    def _get_coalesce_key(
+        prompt_or_messages, call_ability, *args, **kwargs
+    ) -> Optional[str]:
+        # Only greedy, non-streaming requests without a request id give the same
+        # result when run again, identical ones can share a single inference.
+        generate_config = args[0] if args else None
+        if not generate_config or generate_config.get("stream", False):
+            return None
+        if generate_config.get("request_id") is not None:
+            return None
+        temperature = generate_config.get("temperature")
+        if temperature is None or float(temperature) >= 1e-5:
+            return None
+        payload = json.dumps(
+            [prompt_or_messages, call_ability, generate_config, kwargs],
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _get_result_futures(self, req: InferenceRequest) -> List:
+        futures = [req.future_or_queue]
+        if req.coalesce_key is not None:
+            with self._inflight_lock:
+                futures.extend(self._inflight.pop(req.coalesce_key, []))
+        return futures
+
+    @staticmethod
+    def _copy_with_new_id(completion: Dict) -> Dict:
+        # each coalesced caller gets a response of its own, ids must not repeat
+        prefix = "chat" if str(completion["id"]).startswith("chat") else ""
+        return {**completion, "id": prefix + str(uuid.uuid4())}
+
+    def _set_future_result(self, req: InferenceRequest, result):
+        for i, future in enumerate(self._get_result_futures(req)):
+            waiter_result = result
+            if i > 0 and isinstance(result, dict) and "id" in result:
+                waiter_result = self._copy_with_new_id(result)
+            # a waiter's loop cancels its future when the caller goes away,
+            # from another thread at any time, so done() cannot be checked first
+            try:
+                future.set_result(waiter_result)
+            except InvalidStateError:
+                pass
+
+    def _set_future_exception(self, req: InferenceRequest, exc: Exception):
+        for future in self._get_result_futures(req):
+            try:
+                future.set_exception(exc)
+            except InvalidStateError:
+                pass
+
+    @staticmethod
+    def _get_waiting_rank(req: InferenceRequest) -> float:
+        from ..types import max_tokens_field
+
+        generate_config = req.generate_config or {}
+        max_tokens = int(generate_config.get("max_tokens") or max_tokens_field.default)
+        return time.monotonic() + max_tokens * _WAITING_SECONDS_PER_MAX_TOKEN
+
+    def _notify_has_work(self):
+        # `run` is driven by the isolation loop in another thread
+        if self._isolation is not None and self._has_work is not None:
+            self._isolation.loop.call_soon_threadsafe(self._has_work.set)
 
     async def abort_request(self, req_id: str) -> str:
         """
@@ -449,10 +594,19 @@ class SchedulerActor(xo.StatelessActor):
             return AbortRequestMessage.DONE.name
 
     async def run(self):
+        self._has_work = asyncio.Event()
         try:
             while True:
-                # wait 10ms
-                await asyncio.sleep(0.01)
+                if not self._waiting_queue and not self._running_queue:
+                    # idle, sleep until `add_request` wakes us up
+                    await self._has_work.wait()
+                    self._has_work.clear()
+                elif self._model is None:
+                    # nothing can run until the model is set
+                    await asyncio.sleep(0.01)
+                else:
+                    # run steps back to back, only yielding to the loop
+                    await asyncio.sleep(0)
                 await self.step()
         except Exception as e:
             logger.exception(
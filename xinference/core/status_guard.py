@@ -63,6 +63,14 @@ class StatusGuardActor(xo.StatelessActor):
         ]
 
     def set_instance_info(self, model_uid: str, info: InstanceInfo):
+        # Terminated instances are never reported again, drop them here so that
+        # the infos do not keep growing with every launch.
+        for uid in [
+            uid
+            for uid, existing in self._model_uid_to_info.items()
+            if existing.status == LaunchStatus.TERMINATED.name
+        ]:
+            del self._model_uid_to_info[uid]
         self._model_uid_to_info[model_uid] = info
 
     def get_instance_info(
@@ -88,4 +96,8 @@ class StatusGuardActor(xo.StatelessActor):
         return len(self.get_instance_info(model_name=model_name))
 
     def update_instance_info(self, model_uid: str, info: Dict):
-        self._model_uid_to_info[model_uid].update(**info)
+        instance_info = self._model_uid_to_info.get(model_uid)
+        if instance_info is None:
+            logger.debug("Instance info is already dropped, model uid: %s", model_uid)
+            return
+        instance_info.update(**info)
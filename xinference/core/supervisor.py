@@ -13,6 +13,7 @@
 # limitations under the License.
 
 import asyncio
+import heapq
 import itertools
 import os
 import signal
@@ -101,6 +102,12 @@ class SupervisorActor(xo.StatelessActor):
             str, xo.ActorRefType["WorkerActor"]
         ] = {}
         self._model_uid_to_replica_info: Dict[str, ReplicaInfo] = {}  # type: ignore
+        # number of running models per worker, and a min-heap of (load, address)
+        # over it. Heap entries whose load is outdated are skipped lazily.
+        self._worker_address_to_load: Dict[str, int] = {}
+        self._worker_load_heap: List[Tuple[int, str]] = []
+        # bumped whenever the set of running models changes
+        self._models_version = 0
         self._uptime = None
         self._lock = asyncio.Lock()
 
@@ -323,21 +330,17 @@ class SupervisorActor(xo.StatelessActor):
     @staticmethod
     async def get_builtin_families() -> Dict[str, List[str]]:
         from ..model.llm.llm_family import (
-            BUILTIN_LLM_FAMILIES,
             BUILTIN_LLM_MODEL_CHAT_FAMILIES,
             BUILTIN_LLM_MODEL_GENERATE_FAMILIES,
             BUILTIN_LLM_MODEL_TOOL_CALL_FAMILIES,
+            BUILTIN_LLM_MODEL_VISION_FAMILIES,
         )
 
         return {
             "chat": list(BUILTIN_LLM_MODEL_CHAT_FAMILIES),
             "generate": list(BUILTIN_LLM_MODEL_GENERATE_FAMILIES),
             "tools": list(BUILTIN_LLM_MODEL_TOOL_CALL_FAMILIES),
-            "vision": [
-                family.model_name
-                for family in BUILTIN_LLM_FAMILIES
-                if "vision" in family.model_ability
-            ],
+            "vision": list(BUILTIN_LLM_MODEL_VISION_FAMILIES),
         }
 
     async def get_devices_count(self) -> int:
@@ -352,24 +355,30 @@ class SupervisorActor(xo.StatelessActor):
 
     async def _choose_worker(self) -> xo.ActorRefType["WorkerActor"]:
         # TODO: better allocation strategy.
-        min_running_model_count = None
-        target_worker = None
-
-        workers = list(self._worker_address_to_worker.values())
-        for worker in workers:
-            running_model_count = await worker.get_model_count()
-            if (
-                min_running_model_count is None
-                or running_model_count < min_running_model_count
-            ):
-                min_running_model_count = running_model_count
-                target_worker = worker
-
-        if target_worker:
-            return target_worker
+        heap = self._worker_load_heap
+        while heap:
+            load, address = heap[0]
+            if self._worker_address_to_load.get(address) == load:
+                return self._worker_address_to_worker[address]
+            heapq.heappop(heap)
 
         raise RuntimeError("No available worker found")
 
+    def _update_worker_load(self, worker_address: str, delta: int):
+        if worker_address not in self._worker_address_to_load:
+            return
+        load = self._worker_address_to_load[worker_address] + delta
+        self._worker_address_to_load[worker_address] = load
+        if len(self._worker_load_heap) > 4 * len(self._worker_address_to_load):
+            # too many outdated entries, rebuild the heap from the current loads.
+            self._worker_load_heap = [
+                (load, address)
+                for address, load in self._worker_address_to_load.items()
+            ]
+            heapq.heapify(self._worker_load_heap)
+        else:
+            heapq.heappush(self._worker_load_heap, (load, worker_address))
+
     @log_sync(logger=logger)
     def get_status(self) -> Dict:
         return {
@@ -980,23 +989,31 @@ class SupervisorActor(xo.StatelessActor):
             )
             # LLM as default for compatibility
             model_type = model_type or "LLM"
-            await worker_ref.launch_builtin_model(
-                model_uid=_replica_model_uid,
-                model_name=model_name,
-                model_size_in_billions=model_size_in_billions,
-                model_format=model_format,
-                quantization=quantization,
-                model_engine=model_engine,
-                model_type=model_type,
-                n_gpu=n_gpu,
-                request_limits=request_limits,
-                peft_model_config=peft_model_config,
-                gpu_idx=replica_gpu_idx,
-                download_hub=download_hub,
-                model_path=model_path,
-                **kwargs,
-            )
+            # Count the model before it is ready, so that concurrent launches
+            # spread over the workers.
+            self._update_worker_load(worker_ref.address, 1)
+            try:
+                await worker_ref.launch_builtin_model(
+                    model_uid=_replica_model_uid,
+                    model_name=model_name,
+                    model_size_in_billions=model_size_in_billions,
+                    model_format=model_format,
+                    quantization=quantization,
+                    model_engine=model_engine,
+                    model_type=model_type,
+                    n_gpu=n_gpu,
+                    request_limits=request_limits,
+                    peft_model_config=peft_model_config,
+                    gpu_idx=replica_gpu_idx,
+                    download_hub=download_hub,
+                    model_path=model_path,
+                    **kwargs,
+                )
+            except:
+                self._update_worker_load(worker_ref.address, -1)
+                raise
             self._replica_model_uid_to_worker[_replica_model_uid] = worker_ref
+            self._models_version += 1
 
         async def _launch_model():
             try:
@@ -1089,6 +1106,7 @@ class SupervisorActor(xo.StatelessActor):
                             self._replica_model_uid_to_worker.pop(
                                 replica_model_uid, None
                             )
+                        self._models_version += 1
                         dead_nodes.append(address)
                     elif (
                         status.failure_remaining_count
@@ -1103,6 +1121,7 @@ class SupervisorActor(xo.StatelessActor):
                 for address in dead_nodes:
                     self._worker_status.pop(address, None)
                     self._worker_address_to_worker.pop(address, None)
+                    self._worker_address_to_load.pop(address, None)
             finally:
                 await asyncio.sleep(XINFERENCE_HEALTH_CHECK_INTERVAL)
 
@@ -1117,6 +1136,8 @@ class SupervisorActor(xo.StatelessActor):
                 )
             await worker_ref.terminate_model(model_uid=_replica_model_uid)
             del self._replica_model_uid_to_worker[_replica_model_uid]
+            self._models_version += 1
+            self._update_worker_load(worker_ref.address, -1)
 
         replica_info = self._model_uid_to_replica_info.get(model_uid, None)
         if replica_info is None:
@@ -1168,15 +1189,28 @@ class SupervisorActor(xo.StatelessActor):
     async def list_models(self) -> Dict[str, Dict[str, Any]]:
         ret = {}
 
-        workers = list(self._worker_address_to_worker.values())
-        for worker in workers:
-            ret.update(await worker.list_models())
+        # Only ask the workers that host models, all at once.
+        workers = {
+            worker.address: worker
+            for worker in self._replica_model_uid_to_worker.values()
+        }
+        for models in await asyncio.gather(
+            *[worker.list_models() for worker in workers.values()]
+        ):
+            ret.update(models)
         running_model_info = {parse_replica_model_uid(k)[0]: v for k, v in ret.items()}
         # add replica count
         for k, v in running_model_info.items():
             v["replica"] = self._model_uid_to_replica_info[k].replica
         return running_model_info
 
+    def get_models_version(self) -> str:
+        """
+        An opaque token that changes whenever a model is launched or terminated,
+        so callers can tell whether a previous ``list_models`` result is stale.
+        """
+        return f"{self._uptime}-{self._models_version}"
+
     def is_local_deployment(self) -> bool:
         # TODO: temporary.
         return (
@@ -1250,6 +1284,8 @@ class SupervisorActor(xo.StatelessActor):
             address=worker_address, uid=WorkerActor.default_uid()
         )
         self._worker_address_to_worker[worker_address] = worker_ref
+        self._worker_address_to_load[worker_address] = 0
+        heapq.heappush(self._worker_load_heap, (0, worker_address))
         logger.debug("Worker %s has been added successfully", worker_address)
 
     @log_async(logger=logger)
@@ -1263,7 +1299,10 @@ class SupervisorActor(xo.StatelessActor):
             model_uid, _, _ = parse_replica_model_uid(replica_model_uid)
             self._model_uid_to_replica_info.pop(model_uid, None)
             self._replica_model_uid_to_worker.pop(replica_model_uid, None)
+        if uids_to_remove:
+            self._models_version += 1
 
+        self._worker_address_to_load.pop(worker_address, None)
         if worker_address in self._worker_address_to_worker:
             del self._worker_address_to_worker[worker_address]
             logger.debug("Worker %s has been removed successfully", worker_address)
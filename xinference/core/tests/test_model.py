@@ -0,0 +1,87 @@
+# Copyright 2022-2024 XProbe Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import threading
+
+import pytest
+
+from ..model import _STREAM_BUFFER_SIZE, ModelActor
+
+
+async def _collect(gen):
+    return [chunk async for chunk in gen]
+
+
+async def test_coalesce_chunks_merges_ready_chunks():
+    async def agen():
+        for chunk in (b"a", b"b", b"c"):
+            yield chunk
+
+    assert await _collect(ModelActor._coalesce_chunks(agen())) == [b"abc"]
+
+    def sync_gen():
+        yield from (b"a", b"b", b"c")
+
+    chunks = await _collect(ModelActor._coalesce_chunks(sync_gen()))
+    assert b"".join(chunks) == b"abc"
+
+
+@pytest.mark.parametrize("is_async", [True, False])
+async def test_coalesce_chunks_error_after_chunks(is_async):
+    def sync_gen():
+        yield b"a"
+        yield b"b"
+        raise ValueError("boom")
+
+    async def agen():
+        for chunk in sync_gen():
+            yield chunk
+
+    received = []
+    with pytest.raises(ValueError, match="boom"):
+        async for chunk in ModelActor._coalesce_chunks(
+            agen() if is_async else sync_gen()
+        ):
+            received.append(chunk)
+    assert b"".join(received) == b"ab"
+
+
+@pytest.mark.parametrize("is_async", [True, False])
+async def test_coalesce_chunks_closes_gen_on_early_exit(is_async):
+    closed = threading.Event()
+    produced = []
+
+    def sync_gen():
+        try:
+            for i in range(10000):
+                produced.append(i)
+                yield b"x"
+        finally:
+            closed.set()
+
+    async def agen():
+        try:
+            for i in range(10000):
+                produced.append(i)
+                yield b"x"
+        finally:
+            closed.set()
+
+    coalesced = ModelActor._coalesce_chunks(agen() if is_async else sync_gen())
+    assert await coalesced.__anext__()
+    await coalesced.aclose()
+
+    assert closed.is_set()
+    # generation stopped once the buffer was full
+    assert len(produced) <= 2 * _STREAM_BUFFER_SIZE + 2
@@ -317,6 +317,48 @@ async def test_restful_api(setup):
     assert custom_model_reg is None
 
 
+def test_list_models_etag(setup):
+    endpoint, _ = setup
+    url = f"{endpoint}/v1/models"
+
+    response = requests.get(url)
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    # unchanged model list
+    response = requests.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
+    assert not response.content
+
+    # launch
+    payload = {
+        "model_uid": "test_etag",
+        "model_name": "gte-base",
+        "model_type": "embedding",
+    }
+    response = requests.post(url, json=payload)
+    assert response.status_code == 200
+
+    response = requests.get(url, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    launched_etag = response.headers["ETag"]
+    assert launched_etag != etag
+    assert [m["id"] for m in response.json()["data"]] == ["test_etag"]
+
+    response = requests.get(url, headers={"If-None-Match": launched_etag})
+    assert response.status_code == 304
+
+    # terminate
+    response = requests.delete(f"{url}/test_etag")
+    assert response.status_code == 200
+
+    response = requests.get(url, headers={"If-None-Match": launched_etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] not in (etag, launched_etag)
+    assert len(response.json()["data"]) == 0
+
+
 def test_restful_api_for_embedding(setup):
     model_name = "gte-base"
     model_spec = BUILTIN_EMBEDDING_MODELS[model_name]
@@ -0,0 +1,199 @@
+# Copyright 2022-2024 XProbe Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import asyncio
+import threading
+import types
+from collections import Counter
+from concurrent.futures import Future as ConcurrentFuture
+
+from .. import scheduler as scheduler_module
+from ..scheduler import SchedulerActor
+
+
+class FakeModel:
+    """Finishes every request in the step it is scheduled, echoing its prompt."""
+
+    def __init__(self, max_num_seqs: int):
+        self.max_num_seqs = max_num_seqs
+        self.batches = []
+
+    def get_max_num_seqs(self):
+        return self.max_num_seqs
+
+    def batch_inference(self, req_list):
+        self.batches.append([r.prompt for r in req_list])
+        for r in req_list:
+            r.stopped = True
+            r.completion = [r.prompt]
+
+
+def _create_scheduler(max_num_seqs: int, model_cls=FakeModel):
+    scheduler = SchedulerActor()
+    # no torch device to clean up
+    scheduler._empty_cache = lambda: None
+    model = model_cls(max_num_seqs)
+    scheduler.set_model(model)
+    return scheduler, model
+
+
+async def _add(scheduler, prompt, generate_config):
+    future = ConcurrentFuture()
+    await scheduler.add_request(prompt, future, "generate", generate_config)
+    return future
+
+
+async def _drain(scheduler):
+    while scheduler._waiting_queue or scheduler._running_queue:
+        await scheduler.step()
+
+
+async def test_shortest_job_first(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(
+        scheduler_module, "time", types.SimpleNamespace(monotonic=lambda: now[0])
+    )
+    scheduler, model = _create_scheduler(max_num_seqs=1)
+
+    for max_tokens in (1000, 10, 100):
+        await _add(scheduler, f"p{max_tokens}", {"max_tokens": max_tokens})
+    await _drain(scheduler)
+    assert model.batches == [["p10"], ["p100"], ["p1000"]]
+
+    # a long request is only pushed back by a bounded amount of time
+    model.batches.clear()
+    await _add(scheduler, "long", {"max_tokens": 1000})
+    now[0] += 60
+    await _add(scheduler, "short", {"max_tokens": 1})
+    await _drain(scheduler)
+    assert model.batches == [["long"], ["short"]]
+
+
+async def test_concurrent_add_request():
+    scheduler, model = _create_scheduler(max_num_seqs=3)
+    submitted = []
+
+    def produce(thread_idx: int):
+        loop = asyncio.new_event_loop()
+        try:
+            for i in range(50):
+                prompt = f"{thread_idx}-{i}"
+                future = loop.run_until_complete(
+                    _add(scheduler, prompt, {"max_tokens": (i * 37) % 500 + 1})
+                )
+                submitted.append((prompt, future))
+        finally:
+            loop.close()
+
+    threads = [threading.Thread(target=produce, args=(i,)) for i in range(4)]
+    for t in threads:
+        t.start()
+    while any(t.is_alive() for t in threads):
+        await scheduler.step()
+    for t in threads:
+        t.join()
+    await _drain(scheduler)
+
+    assert len(submitted) == 200
+    # resolving a future twice would have raised inside `step`
+    for prompt, future in submitted:
+        assert future.result(timeout=0) == prompt
+    counts = Counter(prompt for batch in model.batches for prompt in batch)
+    assert len(counts) == 200
+    assert set(counts.values()) == {1}
+
+
+async def test_prefill_size_ratio_defers_long_prompt():
+    scheduler, model = _create_scheduler(max_num_seqs=4)
+    short_future = await _add(scheduler, "a" * 10, {"max_tokens": 16})
+    long_future = await _add(scheduler, "b" * 100, {"max_tokens": 16})
+
+    await scheduler.step()
+    assert model.batches == [["a" * 10]]
+    assert short_future.result(timeout=0) == "a" * 10
+    assert not long_future.done()
+
+    await scheduler.step()
+    assert model.batches[-1] == ["b" * 100]
+    assert long_future.result(timeout=0) == "b" * 100
+
+
+async def test_identical_greedy_requests_share_inference():
+    scheduler, model = _create_scheduler(max_num_seqs=4)
+    config = {"max_tokens": 16, "temperature": 0}
+    futures = [await _add(scheduler, "same", dict(config)) for _ in range(3)]
+    # the caller of the second request disconnected
+    assert futures[1].cancel()
+
+    await _drain(scheduler)
+    assert model.batches == [["same"]]
+    assert futures[0].result(timeout=0) == "same"
+    assert futures[1].cancelled()
+    assert futures[2].result(timeout=0) == "same"
+    assert not scheduler._inflight
+
+    # sampled requests are not coalesced
+    model.batches.clear()
+    sampled = [
+        await _add(scheduler, "same", {"max_tokens": 16, "temperature": 0.7})
+        for _ in range(2)
+    ]
+    await _drain(scheduler)
+    assert model.batches == [["same", "same"]]
+    assert all(f.result(timeout=0) == "same" for f in sampled)
+
+
+class _CancelledAfterCheckFuture(ConcurrentFuture):
+    """Cancelled by its caller's loop right after the scheduler looked at it."""
+
+    def done(self):
+        return False
+
+
+async def test_waiter_cancelled_while_result_is_set():
+    scheduler, model = _create_scheduler(max_num_seqs=4)
+    config = {"max_tokens": 16, "temperature": 0}
+    first = await _add(scheduler, "same", dict(config))
+    racy = _CancelledAfterCheckFuture()
+    await scheduler.add_request("same", racy, "generate", dict(config))
+    last = await _add(scheduler, "same", dict(config))
+    assert racy.cancel()
+
+    await _drain(scheduler)
+    assert first.result(timeout=0) == "same"
+    assert racy.cancelled()
+    assert last.result(timeout=0) == "same"
+
+
+class CompletionFakeModel(FakeModel):
+    def batch_inference(self, req_list):
+        self.batches.append([r.prompt for r in req_list])
+        for r in req_list:
+            r.stopped = True
+            r.completion = [
+                {"id": "chat" + r.chunk_id, "created": 1, "choices": [r.prompt]}
+            ]
+
+
+async def test_coalesced_waiters_get_their_own_ids():
+    scheduler, model = _create_scheduler(4, model_cls=CompletionFakeModel)
+    config = {"max_tokens": 16, "temperature": 0}
+    futures = [await _add(scheduler, "same", dict(config)) for _ in range(3)]
+
+    await _drain(scheduler)
+    assert model.batches == [["same"]]
+    results = [f.result(timeout=0) for f in futures]
+    assert len({r["id"] for r in results}) == 3
+    assert all(r["id"].startswith("chat") for r in results)
+    assert all(r["choices"] == ["same"] for r in results)
@@ -436,3 +436,101 @@ async def test_launch_model_with_gpu_idx(setup_pool):
     for info in [embedding_info, user_specified_info]:
         for dev, details in info.items():
             assert len(details) == 0
+
+
+class EvictionMockWorkerActor(MockWorkerActor):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._evicted_via_supervisor: List[str] = []
+        self._supervisor_terminate_fails = False
+
+    async def get_supervisor_ref(self, add_worker: bool = True):
+        worker = self
+
+        class _MockSupervisor:
+            async def terminate_model(self, model_uid: str):
+                if worker._supervisor_terminate_fails:
+                    raise RuntimeError("supervisor unreachable")
+                worker._evicted_via_supervisor.append(model_uid)
+
+        return _MockSupervisor()
+
+    async def launch_builtin_model(self, model_uid: str, *args, **kwargs):
+        await super().launch_builtin_model(model_uid, *args, **kwargs)
+        self._model_uid_to_model[model_uid] = model_uid
+
+    async def terminate_model(self, model_uid: str, is_model_die=False):
+        await super().terminate_model(model_uid)
+        self._model_uid_to_model.pop(model_uid, None)
+
+    def set_launching(self, model_uid: str):
+        self._model_uid_launching_guard[model_uid] = True
+
+    def set_supervisor_terminate_fails(self, fails: bool):
+        self._supervisor_terminate_fails = fails
+
+    def get_evicted_via_supervisor(self) -> List[str]:
+        return self._evicted_via_supervisor
+
+    def get_model_uids(self) -> List[str]:
+        return list(self._model_uid_to_model)
+
+
+@pytest.mark.asyncio
+async def test_evict_if_needed(setup_pool):
+    pool = setup_pool
+    addr = pool.external_address
+
+    worker: xo.ActorRefType["EvictionMockWorkerActor"] = await xo.create_actor(  # type: ignore
+        EvictionMockWorkerActor,
+        address=addr,
+        uid=WorkerActor.default_uid(),
+        supervisor_address="test",
+        main_pool=pool,
+        cuda_devices=[i for i in range(2)],
+    )
+
+    for model_uid in ("model_1-1-0", "model_2-2-0", "model_3-1-0"):
+        await worker.launch_builtin_model(model_uid, "mock_model_name", None, None, None)
+    # using model_1 makes model_3 the least recently used single-replica model
+    await worker.get_model("model_1-1-0")
+    # a launch in progress takes a slot as well
+    await worker.set_launching("model_4-1-0")
+
+    await worker.evict_if_needed(3)
+    assert await worker.get_evicted_via_supervisor() == ["model_3"]
+    assert await worker.get_model_uids() == ["model_2-2-0", "model_1-1-0"]
+
+    # the multi-replica model is never evicted, even when still over the limit
+    await worker.evict_if_needed(1)
+    assert await worker.get_evicted_via_supervisor() == ["model_3", "model_1"]
+    assert await worker.get_model_uids() == ["model_2-2-0"]
+
+
+@pytest.mark.asyncio
+async def test_evict_if_needed_supervisor_fails(setup_pool):
+    pool = setup_pool
+    addr = pool.external_address
+
+    worker: xo.ActorRefType["EvictionMockWorkerActor"] = await xo.create_actor(  # type: ignore
+        EvictionMockWorkerActor,
+        address=addr,
+        uid=WorkerActor.default_uid(),
+        supervisor_address="test",
+        main_pool=pool,
+        cuda_devices=[i for i in range(2)],
+    )
+
+    for model_uid in ("model_1-1-0", "model_2-1-0"):
+        await worker.launch_builtin_model(model_uid, "mock_model_name", None, None, None)
+
+    # the supervisor would still list the model, so it is not terminated locally
+    await worker.set_supervisor_terminate_fails(True)
+    await worker.evict_if_needed(1)
+    assert await worker.get_evicted_via_supervisor() == []
+    assert await worker.get_model_uids() == ["model_1-1-0", "model_2-1-0"]
+
+    await worker.set_supervisor_terminate_fails(False)
+    await worker.evict_if_needed(1)
+    assert await worker.get_evicted_via_supervisor() == ["model_1"]
+    assert await worker.get_model_uids() == ["model_2-1-0"]
@@ -57,7 +57,7 @@ def log_async(
         async def wrapped(*args, **kwargs):
             request_id_str = kwargs.get("request_id", "")
             if not request_id_str:
-                request_id_str = uuid.uuid1()
+                request_id_str = uuid.uuid4()
                 if func_name == "text_to_image":
                     kwargs["request_id"] = request_id_str
             request_id_str = f"[request {request_id_str}]"
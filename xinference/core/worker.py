@@ -21,7 +21,7 @@ import shutil
 import signal
 import threading
 import time
-from collections import defaultdict
+from collections import OrderedDict, defaultdict
 from logging import getLogger
 from typing import Any, Dict, List, Literal, Optional, Set, Tuple, Union
 
@@ -34,6 +34,7 @@ from ..constants import (
     XINFERENCE_DISABLE_HEALTH_CHECK,
     XINFERENCE_DISABLE_METRICS,
     XINFERENCE_HEALTH_CHECK_INTERVAL,
+    XINFERENCE_WORKER_MAX_MODELS,
 )
 from ..core.model import ModelActor
 from ..core.status_guard import LaunchStatus
@@ -88,7 +89,10 @@ class WorkerActor(xo.StatelessActor):
         # temporary placeholder during model launch process:
         self._model_uid_launching_guard: Dict[str, bool] = {}
         # attributes maintained after model launched:
-        self._model_uid_to_model: Dict[str, xo.ActorRefType["ModelActor"]] = {}
+        # ordered from least to most recently used, for LRU eviction.
+        self._model_uid_to_model: "OrderedDict[str, xo.ActorRefType[ModelActor]]" = (
+            OrderedDict()
+        )
         self._model_uid_to_model_spec: Dict[str, ModelDescription] = {}
         self._gpu_to_model_uid: Dict[int, str] = {}
         self._gpu_to_embedding_model_uids: Dict[int, Set[str]] = defaultdict(set)
@@ -99,6 +103,9 @@ class WorkerActor(xo.StatelessActor):
         self._model_uid_to_addr: Dict[str, str] = {}
         self._model_uid_to_recover_count: Dict[str, Optional[int]] = {}
         self._model_uid_to_launch_args: Dict[str, Dict] = {}
+        # launches of the same model spec wait for each other, so that concurrent
+        # launches download the model files only once.
+        self._model_spec_to_lock: Dict[Tuple, asyncio.Lock] = defaultdict(asyncio.Lock)
 
         if XINFERENCE_DISABLE_METRICS:
             logger.info(
@@ -859,27 +866,39 @@ class WorkerActor(xo.StatelessActor):
 
         try:
             self._model_uid_launching_guard[model_uid] = True
+            if XINFERENCE_WORKER_MAX_MODELS is not None:
+                # this launch is counted through the guard above
+                await self.evict_if_needed(XINFERENCE_WORKER_MAX_MODELS)
             subpool_address, devices = await self._create_subpool(
                 model_uid, model_type, n_gpu=n_gpu, gpu_idx=gpu_idx
             )
 
+            model_spec_key = (
+                model_type,
+                model_name,
+                model_format,
+                str(model_size_in_billions),
+                quantization,
+                download_hub,
+            )
             try:
-                model, model_description = await asyncio.to_thread(
-                    create_model_instance,
-                    subpool_address,
-                    devices,
-                    model_uid,
-                    model_type,
-                    model_name,
-                    model_engine,
-                    model_format,
-                    model_size_in_billions,
-                    quantization,
-                    peft_model_config,
-                    download_hub,
-                    model_path,
-                    **kwargs,
-                )
+                async with self._model_spec_to_lock[model_spec_key]:
+                    model, model_description = await asyncio.to_thread(
+                        create_model_instance,
+                        subpool_address,
+                        devices,
+                        model_uid,
+                        model_type,
+                        model_name,
+                        model_engine,
+                        model_format,
+                        model_size_in_billions,
+                        quantization,
+                        peft_model_config,
+                        download_hub,
+                        model_path,
+                        **kwargs,
+                    )
                 await self.update_cache_status(model_name, model_description)
                 model_ref = await xo.create_actor(
                     ModelActor,
@@ -981,6 +1000,58 @@ class WorkerActor(xo.StatelessActor):
                 origin_uid, {"status": status}
             )
 
+    async def evict_if_needed(self, max_n: int):
+        """
+        Terminate least recently used models until the running and launching
+        models on this worker are no more than `max_n`.
+
+        Only single-replica models are evicted, since terminating a model through
+        the supervisor stops all of its replicas across the cluster.
+        """
+        while True:
+            occupied = len(
+                self._model_uid_to_model.keys() | self._model_uid_launching_guard.keys()
+            )
+            if occupied <= max_n:
+                return
+            model_uid = next(
+                (
+                    uid
+                    for uid in self._model_uid_to_model
+                    if parse_replica_model_uid(uid)[1] <= 1
+                ),
+                None,
+            )
+            if model_uid is None:
+                logger.warning(
+                    "Worker holds %s models, more than %s, "
+                    "but none of them has a single replica to evict",
+                    occupied,
+                    max_n,
+                )
+                return
+            origin_uid, _, _ = parse_replica_model_uid(model_uid)
+            logger.info(
+                "Worker holds %s models, evicting least recently used: %s",
+                occupied,
+                model_uid,
+            )
+            try:
+                # Go through the supervisor so that its bookkeeping stays in sync.
+                supervisor_ref = await self.get_supervisor_ref(add_worker=False)
+                await supervisor_ref.terminate_model(origin_uid)
+            except Exception:
+                # terminating it locally would leave the supervisor believing the
+                # model is still running, so keep it until the next eviction
+                logger.warning(
+                    "Evict model %s via supervisor failed, skip eviction",
+                    model_uid,
+                    exc_info=True,
+                )
+                return
+            if model_uid in self._model_uid_to_model:
+                await self.terminate_model(model_uid)
+
     # Provide an interface for future version of supervisor to call
     def get_model_launch_status(self, model_uid: str) -> Optional[str]:
         """
@@ -1010,6 +1081,7 @@ class WorkerActor(xo.StatelessActor):
         model_ref = self._model_uid_to_model.get(model_uid, None)
         if model_ref is None:
             raise ValueError(f"Model not found, uid: {model_uid}")
+        self._model_uid_to_model.move_to_end(model_uid)
         return model_ref
 
     @log_sync(logger=logger)
@@ -1108,8 +1180,8 @@ class WorkerActor(xo.StatelessActor):
 
         return list(paths)
 
-    async def confirm_and_remove_model(self, model_version: str) -> bool:
-        paths = await self.list_deletable_models(model_version)
+    @staticmethod
+    def _remove_paths(paths: List[str]) -> bool:
         for path in paths:
             try:
                 if os.path.islink(path):
@@ -1123,6 +1195,13 @@ class WorkerActor(xo.StatelessActor):
             except Exception as e:
                 logger.error(f"Fail to delete {path} with error:{e}.")
                 return False
+        return True
+
+    async def confirm_and_remove_model(self, model_version: str) -> bool:
+        paths = await self.list_deletable_models(model_version)
+        # Deleting model files may take a while, do not block the worker meanwhile.
+        if not await asyncio.to_thread(self._remove_paths, paths):
+            return False
         await self._cache_tracker_ref.confirm_and_remove_model(
             model_version, self.address
         )
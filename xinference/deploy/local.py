@@ -27,7 +27,7 @@ from ..constants import (
     XINFERENCE_HEALTH_CHECK_INTERVAL,
 )
 from ..core.supervisor import SupervisorActor
-from .utils import health_check
+from .utils import health_check, install_uvloop
 from .worker import start_worker_components
 
 logger = logging.getLogger(__name__)
@@ -75,8 +75,8 @@ def run(
 
     signal.signal(signal.SIGTERM, sigterm_handler)
 
-    loop = asyncio.get_event_loop()
-    task = loop.create_task(
+    install_uvloop()
+    asyncio.run(
         _start_local_cluster(
             address=address,
             metrics_exporter_host=metrics_exporter_host,
@@ -84,7 +84,6 @@ def run(
             logging_conf=logging_conf,
         )
     )
-    loop.run_until_complete(task)
 
 
 def run_in_subprocess(
@@ -27,7 +27,7 @@ from ..constants import (
     XINFERENCE_HEALTH_CHECK_INTERVAL,
 )
 from ..core.supervisor import SupervisorActor
-from .utils import health_check
+from .utils import health_check, install_uvloop
 
 logger = logging.getLogger(__name__)
 
@@ -59,11 +59,8 @@ def run(address: str, logging_conf: Optional[Dict] = None):
 
     signal.signal(signal.SIGTERM, sigterm_handler)
 
-    loop = asyncio.get_event_loop()
-    task = loop.create_task(
-        _start_supervisor(address=address, logging_conf=logging_conf)
-    )
-    loop.run_until_complete(task)
+    install_uvloop()
+    asyncio.run(_start_supervisor(address=address, logging_conf=logging_conf))
 
 
 def run_in_subprocess(
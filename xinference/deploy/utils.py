@@ -12,8 +12,10 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import logging
 import os
+import threading
 import time
 import typing
 from typing import TYPE_CHECKING, Any, Optional
@@ -30,6 +32,10 @@ logger = logging.getLogger(__name__)
 # mainly for k8s
 XINFERENCE_POD_NAME_ENV_KEY = "XINFERENCE_POD_NAME"
 
+# event loop thread shared by all health checks of this process
+_health_check_isolation = None
+_health_check_isolation_lock = threading.Lock()
+
 
 class LoggerNameFilter(logging.Filter):
     def filter(self, record):
@@ -156,13 +162,37 @@ async def create_worker_actor_pool(
     )
 
 
+def install_uvloop():
+    """
+    Use uvloop for the event loops created afterwards when it is installed.
+    uvloop is not available on Windows.
+    """
+    if os.name == "nt":
+        return
+    try:
+        import uvloop
+    except ImportError:
+        return
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+
+def _get_health_check_isolation():
+    global _health_check_isolation
+
+    from ..isolation import Isolation
+
+    with _health_check_isolation_lock:
+        if _health_check_isolation is None:
+            _health_check_isolation = Isolation(asyncio.new_event_loop(), threaded=True)
+            _health_check_isolation.start()
+        return _health_check_isolation
+
+
 def health_check(address: str, max_attempts: int, sleep_interval: int = 3) -> bool:
     async def health_check_internal():
-        import time
-
         attempts = 0
         while attempts < max_attempts:
-            time.sleep(sleep_interval)
+            await asyncio.sleep(sleep_interval)
             try:
                 from ..core.supervisor import SupervisorActor
 
@@ -183,15 +213,7 @@ def health_check(address: str, max_attempts: int, sleep_interval: int = 3) -> bo
 
         return False
 
-    import asyncio
-
-    from ..isolation import Isolation
-
-    isolation = Isolation(asyncio.new_event_loop(), threaded=True)
-    isolation.start()
-    available = isolation.call(health_check_internal())
-    isolation.stop()
-    return available
+    return _get_health_check_isolation().call(health_check_internal())
 
 
 def get_timestamp_ms():
@@ -79,21 +79,19 @@ def main(
     metrics_exporter_port: Optional[int] = None,
     logging_conf: Optional[dict] = None,
 ):
-    loop = asyncio.get_event_loop()
-    task = loop.create_task(
-        _start_worker(
-            address,
-            supervisor_address,
-            metrics_exporter_host,
-            metrics_exporter_port,
-            logging_conf,
-        )
-    )
+    from .utils import install_uvloop
 
+    install_uvloop()
     try:
-        loop.run_until_complete(task)
+        # asyncio.run cancels the worker and waits for it on KeyboardInterrupt.
+        asyncio.run(
+            _start_worker(
+                address,
+                supervisor_address,
+                metrics_exporter_host,
+                metrics_exporter_port,
+                logging_conf,
+            )
+        )
     except KeyboardInterrupt:
-        task.cancel()
-        loop.run_until_complete(task)
-        # avoid displaying exception-unhandled warnings
-        task.exception()
+        pass
@@ -16,6 +16,7 @@ import codecs
 import json
 import os
 import warnings
+from typing import List
 
 from .core import (
     LLM,
@@ -30,6 +31,7 @@ from .llm_family import (
     BUILTIN_LLM_MODEL_CHAT_FAMILIES,
     BUILTIN_LLM_MODEL_GENERATE_FAMILIES,
     BUILTIN_LLM_MODEL_TOOL_CALL_FAMILIES,
+    BUILTIN_LLM_MODEL_VISION_FAMILIES,
     BUILTIN_LLM_PROMPT_STYLE,
     BUILTIN_MODELSCOPE_LLM_FAMILIES,
     LLAMA_CLASSES,
@@ -127,6 +129,44 @@ def register_custom_model():
                 warnings.warn(f"{user_defined_llm_dir}/{f} has error, {e}")
 
 
+def _install_builtin_families(json_name: str, builtin_families: List[LLMFamilyV1]):
+    json_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), json_name)
+    with codecs.open(json_path, "r", encoding="utf-8") as fd:
+        json_objs = json.load(fd)
+    for json_obj in json_objs:
+        model_spec = LLMFamilyV1.parse_obj(json_obj)
+        builtin_families.append(model_spec)
+
+        # register chat_template
+        # note that the key is the model name, since there are multiple
+        # representations of the same prompt style name in json.
+        # if duplicated with huggingface json, keep it as the huggingface style.
+        if (
+            "chat" in model_spec.model_ability
+            and isinstance(model_spec.chat_template, str)
+            and model_spec.model_name not in BUILTIN_LLM_PROMPT_STYLE
+        ):
+            BUILTIN_LLM_PROMPT_STYLE[model_spec.model_name] = {
+                "chat_template": model_spec.chat_template,
+                "stop_token_ids": model_spec.stop_token_ids,
+                "stop": model_spec.stop,
+            }
+        # register model family
+        if "chat" in model_spec.model_ability:
+            BUILTIN_LLM_MODEL_CHAT_FAMILIES.add(model_spec.model_name)
+        else:
+            BUILTIN_LLM_MODEL_GENERATE_FAMILIES.add(model_spec.model_name)
+        if "tools" in model_spec.model_ability:
+            BUILTIN_LLM_MODEL_TOOL_CALL_FAMILIES.add(model_spec.model_name)
+        if "vision" in model_spec.model_ability:
+            BUILTIN_LLM_MODEL_VISION_FAMILIES.add(model_spec.model_name)
+
+        if model_spec.model_name not in LLM_MODEL_DESCRIPTIONS:
+            LLM_MODEL_DESCRIPTIONS.update(generate_llm_description(model_spec))
+        # add engine parameters corresponding to the model name
+        generate_engine_config_by_model_family(model_spec)
+
+
 def _install():
     from .llama_cpp.core import LlamaCppChatModel, LlamaCppModel
     from .lmdeploy.core import LMDeployChatModel, LMDeployModel
@@ -205,103 +245,12 @@ def _install():
     SUPPORTED_ENGINES["MLX"] = MLX_CLASSES
     SUPPORTED_ENGINES["LMDEPLOY"] = LMDEPLOY_CLASSES
 
-    json_path = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), "llm_family.json"
-    )
-    for json_obj in json.load(codecs.open(json_path, "r", encoding="utf-8")):
-        model_spec = LLMFamilyV1.parse_obj(json_obj)
-        BUILTIN_LLM_FAMILIES.append(model_spec)
-
-        # register chat_template
-        if "chat" in model_spec.model_ability and isinstance(
-            model_spec.chat_template, str
-        ):
-            # note that the key is the model name,
-            # since there are multiple representations of the same prompt style name in json.
-            BUILTIN_LLM_PROMPT_STYLE[model_spec.model_name] = {
-                "chat_template": model_spec.chat_template,
-                "stop_token_ids": model_spec.stop_token_ids,
-                "stop": model_spec.stop,
-            }
-        # register model family
-        if "chat" in model_spec.model_ability:
-            BUILTIN_LLM_MODEL_CHAT_FAMILIES.add(model_spec.model_name)
-        else:
-            BUILTIN_LLM_MODEL_GENERATE_FAMILIES.add(model_spec.model_name)
-        if "tools" in model_spec.model_ability:
-            BUILTIN_LLM_MODEL_TOOL_CALL_FAMILIES.add(model_spec.model_name)
-
-    modelscope_json_path = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), "llm_family_modelscope.json"
-    )
-    for json_obj in json.load(codecs.open(modelscope_json_path, "r", encoding="utf-8")):
-        model_spec = LLMFamilyV1.parse_obj(json_obj)
-        BUILTIN_MODELSCOPE_LLM_FAMILIES.append(model_spec)
-
-        # register prompt style, in case that we have something missed
-        # if duplicated with huggingface json, keep it as the huggingface style
-        if (
-            "chat" in model_spec.model_ability
-            and isinstance(model_spec.chat_template, str)
-            and model_spec.model_name not in BUILTIN_LLM_PROMPT_STYLE
-        ):
-            BUILTIN_LLM_PROMPT_STYLE[model_spec.model_name] = {
-                "chat_template": model_spec.chat_template,
-                "stop_token_ids": model_spec.stop_token_ids,
-                "stop": model_spec.stop,
-            }
-        # register model family
-        if "chat" in model_spec.model_ability:
-            BUILTIN_LLM_MODEL_CHAT_FAMILIES.add(model_spec.model_name)
-        else:
-            BUILTIN_LLM_MODEL_GENERATE_FAMILIES.add(model_spec.model_name)
-        if "tools" in model_spec.model_ability:
-            BUILTIN_LLM_MODEL_TOOL_CALL_FAMILIES.add(model_spec.model_name)
-
-    csghub_json_path = os.path.join(
-        os.path.dirname(os.path.abspath(__file__)), "llm_family_csghub.json"
-    )
-    for json_obj in json.load(codecs.open(csghub_json_path, "r", encoding="utf-8")):
-        model_spec = LLMFamilyV1.parse_obj(json_obj)
-        BUILTIN_CSGHUB_LLM_FAMILIES.append(model_spec)
-
-        # register prompt style, in case that we have something missed
-        # if duplicated with huggingface json, keep it as the huggingface style
-        if (
-            "chat" in model_spec.model_ability
-            and isinstance(model_spec.chat_template, str)
-            and model_spec.model_name not in BUILTIN_LLM_PROMPT_STYLE
-        ):
-            BUILTIN_LLM_PROMPT_STYLE[model_spec.model_name] = {
-                "chat_template": model_spec.chat_template,
-                "stop_token_ids": model_spec.stop_token_ids,
-                "stop": model_spec.stop,
-            }
-        # register model family
-        if "chat" in model_spec.model_ability:
-            BUILTIN_LLM_MODEL_CHAT_FAMILIES.add(model_spec.model_name)
-        else:
-            BUILTIN_LLM_MODEL_GENERATE_FAMILIES.add(model_spec.model_name)
-        if "tools" in model_spec.model_ability:
-            BUILTIN_LLM_MODEL_TOOL_CALL_FAMILIES.add(model_spec.model_name)
-
-    for llm_specs in [
-        BUILTIN_LLM_FAMILIES,
-        BUILTIN_MODELSCOPE_LLM_FAMILIES,
-        BUILTIN_CSGHUB_LLM_FAMILIES,
-    ]:
-        for llm_spec in llm_specs:
-            if llm_spec.model_name not in LLM_MODEL_DESCRIPTIONS:
-                LLM_MODEL_DESCRIPTIONS.update(generate_llm_description(llm_spec))
-
-    # traverse all families and add engine parameters corresponding to the model name
-    for families in [
-        BUILTIN_LLM_FAMILIES,
-        BUILTIN_MODELSCOPE_LLM_FAMILIES,
-        BUILTIN_CSGHUB_LLM_FAMILIES,
-    ]:
-        for family in families:
-            generate_engine_config_by_model_family(family)
+    for json_name, builtin_families in (
+        ("llm_family.json", BUILTIN_LLM_FAMILIES),
+        ("llm_family_modelscope.json", BUILTIN_MODELSCOPE_LLM_FAMILIES),
+        ("llm_family_csghub.json", BUILTIN_CSGHUB_LLM_FAMILIES),
+    ):
+        _install_builtin_families(json_name, builtin_families)
 
     register_custom_model()
 
@@ -16,6 +16,8 @@ import os
 import time
 from typing import Dict, Iterator, List, Optional, Union
 
+import psutil
+
 from ....types import (
     ChatCompletion,
     ChatCompletionChunk,
@@ -64,6 +66,15 @@ class LlamaCppModel(LLM):
             llamacpp_model_config.setdefault("n_ctx", self.model_family.context_length)
         llamacpp_model_config.setdefault("use_mmap", False)
         llamacpp_model_config.setdefault("use_mlock", True)
+        # llama.cpp's CPU matmuls saturate one physical core per thread,
+        # hyper-threads only add contention.
+        n_threads = psutil.cpu_count(logical=False)
+        if hasattr(os, "sched_getaffinity"):
+            # containers and taskset may restrict the CPUs this process can use
+            n_usable = len(os.sched_getaffinity(0))
+            n_threads = min(n_threads, n_usable) if n_threads else n_usable
+        if n_threads:
+            llamacpp_model_config.setdefault("n_threads", n_threads)
 
         if (
             "llama-2" in self.model_family.model_name
@@ -11,6 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import importlib.util
 import logging
 import uuid
 from typing import AsyncGenerator, Dict, Iterator, List, Optional, TypedDict, Union
@@ -24,12 +25,8 @@ from ..utils import ChatModelMixin, generate_chat_completion, generate_completio
 
 logger = logging.getLogger(__name__)
 
-try:
-    import lmdeploy  # noqa: F401
-
-    LMDEPLOY_INSTALLED = True
-except ImportError:
-    LMDEPLOY_INSTALLED = False
+# only probe for the package, importing it here would slow down every worker startup
+LMDEPLOY_INSTALLED = importlib.util.find_spec("lmdeploy") is not None
 
 LMDEPLOY_SUPPORTED_CHAT_MODELS = ["internvl2"]
 LMDEPLOY_MODEL_CHAT_TEMPLATE_NAME = {
@@ -208,7 +205,7 @@ class LMDeployChatModel(LMDeployModel, ChatModelMixin):
         from lmdeploy.messages import Response
 
         prompt_tokens, completion_tokens, total_tokens = 0, 0, 0
-        completion_id = str(uuid.uuid1())
+        completion_id = str(uuid.uuid4())
         finish_reason = None
         async for output in self._generate(
             messages,
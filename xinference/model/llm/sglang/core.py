@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import importlib.util
 import json
 import logging
 import time
@@ -55,12 +56,8 @@ class SGLANGGenerateConfig(TypedDict, total=False):
     stream_options: Optional[Union[dict, None]]
 
 
-try:
-    import sglang  # noqa: F401
-
-    SGLANG_INSTALLED = True
-except ImportError:
-    SGLANG_INSTALLED = False
+# only probe for the package, importing it here would slow down every worker startup
+SGLANG_INSTALLED = importlib.util.find_spec("sglang") is not None
 
 SGLANG_SUPPORTED_MODELS = [
     "llama-2",
@@ -340,7 +337,7 @@ class SGLANGModel(LLM):
             else False
         )
         if not request_id:
-            request_id = str(uuid.uuid1())
+            request_id = str(uuid.uuid4())
         if not stream:
             state = await self._non_stream_generate(prompt, **sanitized_generate_config)
             return self._convert_state_to_completion(
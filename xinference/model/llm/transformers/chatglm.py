@@ -388,7 +388,7 @@ class ChatglmPytorchChatModel(PytorchChatModel):
 
             def _stream_generator():
                 last_chunk_text_length = 0
-                chunk_id = "chat-" + str(uuid.uuid1())
+                chunk_id = "chat-" + str(uuid.uuid4())
                 prompt_tokens, completion_tokens, total_tokens = 0, 0, 0
                 prompt_tokens = len(inputs["input_ids"][0])
                 for chunk_text in self._stream_chat(inputs, tools, **kwargs):
@@ -257,7 +257,7 @@ class CogVLM2Model(PytorchChatModel):
         thread = Thread(target=self._model.generate, kwargs=generation_kwargs)
         thread.start()
 
-        completion_id = str(uuid.uuid1())
+        completion_id = str(uuid.uuid4())
         for new_text in streamer:
             yield generate_completion_chunk(
                 chunk_text=new_text,
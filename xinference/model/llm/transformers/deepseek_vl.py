@@ -228,7 +228,7 @@ class DeepSeekVLChatModel(PytorchChatModel):
     def _generate_stream(
         self, streamer, stop_str, include_usage, prompt
     ) -> Iterator[CompletionChunk]:
-        completion_id = str(uuid.uuid1())
+        completion_id = str(uuid.uuid4())
         prompt_tokens, completion_tokens, total_tokens = 0, 0, 0
         input_ids = self._tokenizer(prompt).input_ids
         prompt_tokens = len(input_ids)
@@ -187,7 +187,7 @@ class Glm4VModel(PytorchChatModel):
             return generate_chat_completion(self.model_uid, response)
 
     def chat_stream(self, streamer, stop_str) -> Iterator[CompletionChunk]:
-        completion_id = str(uuid.uuid1())
+        completion_id = str(uuid.uuid4())
         for new_text in streamer:
             if not new_text.endswith(stop_str):
                 yield generate_completion_chunk(
@@ -467,7 +467,7 @@ class InternVLChatModel(PytorchChatModel):
         )
         thread.start()
 
-        completion_id = str(uuid.uuid1())
+        completion_id = str(uuid.uuid4())
         prompt_tokens = len(input_ids[0])
         total_tokens, completion_tokens = 0, 0
         # Loop through the streamer to get the new text as it is generated
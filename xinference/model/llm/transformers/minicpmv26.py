@@ -228,7 +228,7 @@ class MiniCPMV26Model(PytorchChatModel):
             return generate_chat_completion(self.model_uid, chat)
 
     def chat_stream(self, chat) -> Iterator[CompletionChunk]:
-        completion_id = str(uuid.uuid1())
+        completion_id = str(uuid.uuid4())
         for new_text in chat:
             yield generate_completion_chunk(
                 chunk_text=new_text,
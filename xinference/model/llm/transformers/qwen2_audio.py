@@ -148,7 +148,7 @@ class Qwen2AudioChatModel(PytorchChatModel):
         thread = Thread(target=self._model.generate, kwargs=gen_kwargs)
         thread.start()
 
-        completion_id = str(uuid.uuid1())
+        completion_id = str(uuid.uuid4())
         for new_text in streamer:
             yield generate_completion_chunk(
                 chunk_text=new_text,
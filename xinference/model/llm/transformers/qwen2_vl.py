@@ -177,7 +177,7 @@ class Qwen2VLChatModel(PytorchChatModel):
         thread = Thread(target=model_generate)
         thread.start()
 
-        completion_id = str(uuid.uuid1())
+        completion_id = str(uuid.uuid4())
         for new_text in streamer:
             yield generate_completion_chunk(
                 chunk_text=new_text,
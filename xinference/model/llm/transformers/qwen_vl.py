@@ -172,7 +172,7 @@ class QwenVLChatModel(PytorchChatModel):
         response_generator = self._model.chat_stream(
             self._tokenizer, query=prompt, history=qwen_history
         )
-        completion_id = str(uuid.uuid1())
+        completion_id = str(uuid.uuid4())
         prompt_tokens, completion_tokens, total_tokens = 0, 0, 0
         input_ids = self._tokenizer(prompt, allowed_special="all").input_ids
         prompt_tokens = len(input_ids)
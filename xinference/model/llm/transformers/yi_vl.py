@@ -198,7 +198,7 @@ class YiVLChatModel(PytorchChatModel):
     def _generate_stream(
         self, streamer, stop_str, input_ids, include_usage
     ) -> Iterator[CompletionChunk]:
-        completion_id = str(uuid.uuid1())
+        completion_id = str(uuid.uuid4())
         prompt_tokens, completion_tokens, total_tokens = 0, 0, 0
         prompt_tokens = len(input_ids[0])
         for i, new_text in enumerate(streamer):
@@ -613,7 +613,7 @@ def generate_completion(
     finish_reason="stop",
 ) -> Completion:
     return Completion(
-        id=str(uuid.uuid1()),
+        id=str(uuid.uuid4()),
         object="text_completion",
         created=int(time.time()),
         model=model_uid,
@@ -639,7 +639,7 @@ def generate_chat_completion(
     finish_reason="stop",
 ) -> ChatCompletion:
     return ChatCompletion(
-        id="chat" + str(uuid.uuid1()),
+        id="chat" + str(uuid.uuid4()),
         object="chat.completion",
         created=int(time.time()),
         model=model_uid,
@@ -69,6 +69,7 @@ class VLLMModelConfig(TypedDict, total=False):
     quantization: Optional[str]
     max_model_len: Optional[int]
     limit_mm_per_prompt: Optional[Dict[str, int]]
+    enable_prefix_caching: bool
 
 
 class VLLMGenerateConfig(TypedDict, total=False):
@@ -484,7 +485,7 @@ class VLLMModel(LLM):
         )
         sampling_params = SamplingParams(**sanitized_generate_config)
         if not request_id:
-            request_id = str(uuid.uuid1())
+            request_id = str(uuid.uuid4())
 
         assert self._engine is not None
         results_generator = self._engine.generate(
@@ -317,7 +317,7 @@ class RerankModel:
             gc.collect()
             empty_cache()
 
-        return Rerank(id=str(uuid.uuid1()), results=docs, meta=metadata)
+        return Rerank(id=str(uuid.uuid4()), results=docs, meta=metadata)
 
 
 def get_cache_dir(model_spec: RerankModelSpec):